@@ -42,11 +42,22 @@ setup(
     author_email='thipanini94@gmail.com',
     packages=find_packages(),
     install_requires=[
-        'exchangelib==3.3.0',
+        'exchangelib==4.1.0',
         'pretty-html-table==0.9.dev0',
         'pandas',
-        'python-dotenv'
+        'python-dotenv',
+        'pyyaml'
     ],
+    extras_require={
+        'images': ['Pillow'],
+        'delta': ['pyarrow>=14'],
+        'arrow': ['pyarrow>=14']
+    },
+    entry_points={
+        'console_scripts': [
+            'xchange-mail=xchange_mail.cli:main'
+        ]
+    },
     license='MIT',
     description='Solução de gerenciamento e envio de e-mails via MS Exchange',
     long_description=__long_description__,
@@ -0,0 +1,46 @@
+"""
+Tests for the arrow module: detection of Arrow compatible tables and attachment writing
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from xchange_mail.arrow import is_arrow_table
+from xchange_mail.mail import buffer_dataframe
+
+
+class ToArrowOnly:
+    def to_arrow(self):
+        return pa.table({'a': [1]})
+
+
+def test_detection():
+    assert is_arrow_table(pa.table({'a': [1]}))
+    assert is_arrow_table(pa.record_batch({'a': [1]}))
+    assert not is_arrow_table(pd.DataFrame({'a': [1]}))
+    assert not is_arrow_table(ToArrowOnly())
+    assert not is_arrow_table(None)
+
+
+def test_polars_strings_are_written_on_csv_and_parquet():
+    pl = pytest.importorskip('polars')
+    df = pl.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+
+    assert buffer_dataframe('file.csv', df)[1] == b'"a","b"\n1,"x"\n2,"y"\n'
+    table = pa.parquet.read_table(io.BytesIO(buffer_dataframe('file.parquet', df)[1]))
+    assert table.column('b').to_pylist() == ['x', 'y']
+    assert table.schema.field('b').type == pa.large_string()
+
+
+def test_delta_accepts_arrow_tables(tmp_path):
+    from xchange_mail.delta import compute_delta, save_snapshot
+
+    save_snapshot(pa.table({'id': [1, 2], 'value': [10, 20]}), 'report', str(tmp_path), key_cols=['id'])
+    delta, summary = compute_delta(pa.table({'id': [1, 2], 'value': [10, 25]}), 'report', str(tmp_path),
+                                   key_cols=['id'])
+
+    assert delta['id'].tolist() == [2]
@@ -0,0 +1,81 @@
+"""
+Tests for the cli module: manifest reading, environment variables and pooled sessions
+"""
+
+import functools
+
+import pytest
+
+from xchange_mail import cli
+
+
+def write_manifest(tmp_path, content):
+    path = tmp_path / 'manifest.yaml'
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+def test_expands_only_explicit_references(tmp_path, monkeypatch):
+    monkeypatch.setenv('XCHANGE_MAIL_TEST_PWD', 'pa$word')
+    path = write_manifest(tmp_path, """
+jobs:
+  - subject: Report
+    mail_to: first@company.com
+    password: ${XCHANGE_MAIL_TEST_PWD}
+    mail_body: 'Total: R$100 <b>$x</b>'
+""")
+
+    job = cli.read_manifest(path)['jobs'][0]
+
+    assert job['password'] == 'pa$word'
+    assert job['mail_body'] == 'Total: R$100 <b>$x</b>'
+
+
+def test_rejects_unset_variables(tmp_path, monkeypatch):
+    monkeypatch.delenv('XCHANGE_MAIL_TEST_MISSING', raising=False)
+    path = write_manifest(tmp_path, """
+jobs:
+  - subject: Report
+    password: ${XCHANGE_MAIL_TEST_MISSING}
+""")
+
+    with pytest.raises(ValueError, match='XCHANGE_MAIL_TEST_MISSING'):
+        cli.read_manifest(path)
+
+
+def test_unset_check_runs_before_substitution(monkeypatch):
+    # A value holding "${...}" must not be taken as a reference after expansion
+    monkeypatch.setenv('XCHANGE_MAIL_TEST_VALUE', '${NOT_A_REFERENCE}')
+
+    assert cli.unresolved_env_vars({'a': ['${XCHANGE_MAIL_TEST_VALUE}']}) == []
+    assert cli.expand_env_vars('${XCHANGE_MAIL_TEST_VALUE}') == '${NOT_A_REFERENCE}'
+
+
+def test_unknown_job_keys():
+    assert cli.unknown_job_keys({'subject': 'a', 'mail_bdy': 'b', 'access_type': 'impersonation'}) == ['mail_bdy']
+
+
+def test_sessions_keyed_by_access_type(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cli, 'connect_exchange', lambda **kwargs: calls.append(kwargs) or object())
+    cli.init_worker()
+
+    delegate = cli.get_session('user', 'pwd', 'server', 'box@company.com')
+    impersonation = cli.get_session('user', 'pwd', 'server', 'box@company.com', access_type='impersonation')
+
+    assert delegate is not impersonation
+    assert [c['access_type'] for c in calls] == ['delegate', 'impersonation']
+    assert cli.get_session('user', 'pwd', 'server', 'box@company.com') is delegate
+
+
+def test_job_without_recipients_is_not_sent(monkeypatch):
+    monkeypatch.setattr(cli, 'connect_exchange', lambda **kwargs: object())
+    # Keeping the real signature, as job keys are checked against it
+    monkeypatch.setattr(cli, 'send_simple_mail', functools.wraps(cli.send_simple_mail)(lambda **kwargs: False))
+    cli.init_worker()
+
+    result = cli.run_job({'name': 'report', 'username': 'user', 'password': 'pwd', 'server': 'server',
+                          'mail_box': 'box@company.com', 'subject': 'Report', 'mail_to': 'a@company.com'})
+
+    assert not result['ok']
+    assert 'not sent' in result['error']
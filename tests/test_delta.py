@@ -0,0 +1,46 @@
+"""
+Tests for the delta module: snapshot store and delta computation
+"""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from xchange_mail import delta
+from xchange_mail.delta import CHANGE_COL, compute_delta, save_snapshot, send_delta_mail
+
+
+def counts(summary):
+    return dict(zip(summary[CHANGE_COL], summary['rows']))
+
+
+def test_delta_against_snapshot(tmp_path):
+    old = pd.DataFrame({'id': [1, 2, 3], 'value': [10, 20, 30]})
+    new = pd.DataFrame({'id': [1, 2, 4], 'value': [10, 25, 40]})
+    save_snapshot(old, 'report', str(tmp_path), key_cols=['id'])
+
+    result, summary = compute_delta(new, 'report', str(tmp_path), key_cols=['id'])
+
+    assert counts(summary) == {'added': 1, 'changed': 1, 'removed': 1, 'unchanged': 1}
+    assert result.loc[result[CHANGE_COL] == 'removed', 'id'].tolist() == [3]
+    assert list(result.columns) == ['id', 'value', CHANGE_COL]
+
+
+def test_snapshot_with_other_key_cols_is_discarded(tmp_path):
+    df = pd.DataFrame({'id': [1, 2], 'value': [10, 20]})
+    save_snapshot(df, 'report', str(tmp_path), key_cols=['id'])
+
+    result, summary = compute_delta(df, 'report', str(tmp_path), key_cols=None)
+
+    assert counts(summary) == {'added': 2, 'changed': 0, 'removed': 0, 'unchanged': 0}
+
+
+def test_snapshot_is_kept_when_mail_is_not_sent(tmp_path):
+    df = pd.DataFrame({'id': [1, 2], 'value': [10, 20]})
+
+    send_delta_mail('report', df, str(tmp_path), key_cols=['id'], send_func=lambda **kwargs: False)
+    assert not (tmp_path / 'report.parquet').exists()
+
+    send_delta_mail('report', df, str(tmp_path), key_cols=['id'], send_func=lambda **kwargs: True)
+    assert delta.load_snapshot_key_cols(delta.snapshot_path('report', str(tmp_path))) == ['id']
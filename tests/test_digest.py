@@ -0,0 +1,47 @@
+"""
+Tests for the digest module: merging mail specs and the coalescing scheduler
+"""
+
+import pytest
+
+from xchange_mail.digest import DigestScheduler, merge_specs
+from xchange_mail.spec import MailSpec
+
+
+def test_submit_keeps_parsed_recipients_on_spec():
+    scheduler = DigestScheduler(send_func=lambda spec: None)
+    spec = MailSpec('Report A', 'a@x.com; B@x.com', mail_body='a')
+    scheduler.submit(spec)
+    scheduler.submit(MailSpec('Report B', ['b@x.com', 'A@x.com'], mail_body='b'))
+
+    assert spec.mail_to == ['a@x.com', 'B@x.com']
+    assert len(scheduler.groups) == 1
+
+
+def test_merge_keeps_signature_of_each_section():
+    digest = merge_specs([MailSpec('Report A', 'a@x.com', mail_body='body a', mail_signature='<p>sig a</p>'),
+                          MailSpec('Report B', 'a@x.com', mail_body='body b', mail_signature='<p>sig b</p>')])
+
+    assert digest.mail_to == ['a@x.com']
+    assert digest.mail_signature == ''
+    assert digest.mail_body.index('body a') < digest.mail_body.index('sig a') < digest.mail_body.index('body b')
+    assert digest.mail_body.index('body b') < digest.mail_body.index('sig b')
+
+
+def test_failed_digest_is_kept_pending():
+    sent = []
+
+    def send(spec):
+        if 'a@x.com' in spec.mail_to:
+            raise ConnectionError('down')
+        sent.append(spec)
+
+    scheduler = DigestScheduler(send_func=send)
+    scheduler.submit(MailSpec('Report A', 'a@x.com'))
+    scheduler.submit(MailSpec('Report B', 'b@x.com'))
+
+    with pytest.raises(RuntimeError, match='1 of 2 digests failed'):
+        scheduler.flush_all()
+
+    assert [spec.subject for spec in sent] == ['Report B']
+    assert list(scheduler.groups) == [frozenset(['a@x.com'])]
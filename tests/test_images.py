@@ -0,0 +1,63 @@
+"""
+Tests for the images module: metadata stripping and the disk cache under concurrency
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from xchange_mail.images import optimize_image
+
+
+def make_image(path, img_format='JPEG', orientation=None, icc_profile=b'fake icc profile'):
+    img = Image.new('RGB', (40, 20), color=(200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    if orientation is not None:
+        exif[0x0112] = orientation
+    img.save(path, format=img_format, exif=exif.tobytes(), icc_profile=icc_profile)
+    return str(path)
+
+
+def test_strips_metadata_and_applies_orientation(tmp_path):
+    # Orientation 6 means the pixels must be rotated 90 degrees for display
+    path = make_image(tmp_path / 'chart.jpg', orientation=6)
+
+    content = optimize_image(path, cache_dir=str(tmp_path / 'cache'))
+    img = Image.open(io.BytesIO(content))
+
+    assert img.size == (20, 40)
+    assert 'exif' not in img.info
+    assert 'icc_profile' not in img.info
+
+
+def test_strips_png_icc_profile(tmp_path):
+    path = make_image(tmp_path / 'chart.png', img_format='PNG')
+
+    img = Image.open(io.BytesIO(optimize_image(path, cache_dir=str(tmp_path / 'cache'))))
+
+    assert 'icc_profile' not in img.info
+
+
+def test_concurrent_sends_share_cache(tmp_path):
+    path = make_image(tmp_path / 'chart.jpg')
+    cache_dir = str(tmp_path / 'cache')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: optimize_image(path, max_width=30, cache_dir=cache_dir), range(32)))
+
+    assert len(set(results)) == 1
+    assert not [name for name in (tmp_path / 'cache').iterdir() if name.suffix == '.tmp']
+
+
+def test_cache_write_failure_is_not_fatal(tmp_path):
+    path = make_image(tmp_path / 'chart.jpg')
+    cache_dir = tmp_path / 'not_a_dir'
+    cache_dir.write_text('')
+
+    content = optimize_image(path, max_width=30, cache_dir=str(cache_dir))
+
+    assert Image.open(io.BytesIO(content)).width == 30
@@ -0,0 +1,88 @@
+"""
+Tests for the recipients module using a fake Exchange protocol
+"""
+
+from exchangelib.errors import ErrorNameResolutionNoResults, ErrorServerBusy, ErrorNameResolutionNoMailbox
+
+from xchange_mail import recipients
+from xchange_mail.recipients import TTLCache, resolve_recipients
+
+
+class FakeMailbox:
+    def __init__(self, email_address, mailbox_type='Mailbox'):
+        self.email_address = email_address
+        self.mailbox_type = mailbox_type
+
+
+class FakeProtocol:
+    def __init__(self, directory, errors=None):
+        self.directory = directory
+        self.errors = errors or {}
+        self.calls = []
+
+    def resolve_names(self, names):
+        name = names[0]
+        self.calls.append(name)
+        errors = self.errors.get(name, [])
+        if len(errors) > 0:
+            raise errors.pop(0)
+        return self.directory.get(name, [ErrorNameResolutionNoResults('No results')])
+
+    def expand_dl(self, mail):
+        return [FakeMailbox('member1@company.com'), FakeMailbox('member2@company.com')]
+
+
+class FakeAccount:
+    def __init__(self, protocol):
+        self.protocol = protocol
+
+
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(recipients.time, 'sleep', lambda seconds: None)
+
+
+def test_keeps_external_and_replaces_aliases():
+    protocol = FakeProtocol({'alias@company.com': [FakeMailbox('primary@company.com')],
+                             'team@company.com': [FakeMailbox('team@company.com', 'PublicDL')]})
+
+    valid, invalid = resolve_recipients(FakeAccount(protocol), 'partner@gmail.com; alias@company.com;'
+                                        'team@company.com;not-an-address', cache=None)
+
+    assert valid == ['partner@gmail.com', 'primary@company.com', 'member1@company.com', 'member2@company.com']
+    assert invalid == ['not-an-address']
+    assert 'not-an-address' not in protocol.calls
+
+
+def test_rejected_entries_are_invalid():
+    protocol = FakeProtocol({}, errors={'gone@company.com': [ErrorNameResolutionNoMailbox('No mailbox')]})
+
+    valid, invalid = resolve_recipients(FakeAccount(protocol), ['gone@company.com', 'ok@company.com'], cache=None)
+
+    assert valid == ['ok@company.com']
+    assert invalid == ['gone@company.com']
+
+
+def test_throttling_is_retried(monkeypatch):
+    no_sleep(monkeypatch)
+    protocol = FakeProtocol({'busy@company.com': [FakeMailbox('busy@company.com')]},
+                            errors={'busy@company.com': [ErrorServerBusy('Busy', back_off=1)]})
+
+    valid, invalid = resolve_recipients(FakeAccount(protocol), 'busy@company.com', cache=None)
+
+    assert valid == ['busy@company.com']
+    assert invalid == []
+    assert protocol.calls == ['busy@company.com', 'busy@company.com']
+
+
+def test_persistent_throttling_keeps_entry_without_caching(monkeypatch):
+    no_sleep(monkeypatch)
+    errors = [ErrorServerBusy('Busy') for _ in range(3)]
+    protocol = FakeProtocol({}, errors={'busy@company.com': errors})
+    cache = TTLCache()
+
+    valid, invalid = resolve_recipients(FakeAccount(protocol), 'busy@company.com; other@company.com', cache=cache)
+
+    assert valid == ['busy@company.com', 'other@company.com']
+    assert invalid == []
+    assert cache.get(('busy@company.com', True)) is None
+    assert cache.get(('other@company.com', True)) == ['other@company.com']
@@ -0,0 +1,36 @@
+"""
+Tests for the sharding module using fake sending functions
+"""
+
+from exchangelib.errors import ErrorServerBusy
+
+from xchange_mail import sharding
+from xchange_mail.sharding import MailboxPool
+
+
+def make_pool(monkeypatch):
+    monkeypatch.setattr(sharding, 'connect_exchange', lambda **kwargs: object())
+    return MailboxPool([('u1', 'p1', 'box1@company.com'), ('u2', 'p2', 'box2@company.com')], server='server')
+
+
+def test_not_sent_is_reported(monkeypatch):
+    pool = make_pool(monkeypatch)
+
+    assert pool.send(['a@company.com'], send_func=lambda **kwargs: False) is None
+    assert sum(s['sent'] for s in pool.stats()) == 0
+    assert sum(s['in_flight'] for s in pool.stats()) == 0
+
+
+def test_throttled_mail_box_is_skipped(monkeypatch):
+    pool = make_pool(monkeypatch)
+    used = []
+
+    def send_func(mail_box, **kwargs):
+        used.append(mail_box)
+        if mail_box == 'box1@company.com':
+            raise ErrorServerBusy('Busy', back_off=60)
+        return True
+
+    assert pool.send(['a@company.com'], send_func=send_func) == 'box2@company.com'
+    assert used == ['box1@company.com', 'box2@company.com']
+    assert [s['throttled'] for s in pool.stats()] == [True, False]
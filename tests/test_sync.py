@@ -0,0 +1,125 @@
+"""
+Tests for the sync module using a fake SyncFolderItems service
+"""
+
+import inspect
+import json
+
+import pytest
+from exchangelib.errors import ErrorInvalidSyncStateData, ErrorItemNotFound
+from exchangelib.services import SyncFolderItems
+
+from xchange_mail import sync
+
+
+class FakeFolder:
+    absolute = '/root/Inbox'
+
+    def __init__(self, n_items):
+        self.items = list(range(n_items))
+        self.bad_states = set()
+
+    def validate_item_field(self, field, version):
+        pass
+
+    def normalize_fields(self, fields):
+        return []
+
+
+class FakeAccount:
+    primary_smtp_address = 'box@company.com'
+    version = None
+
+    def __init__(self, folder):
+        self.inbox = folder
+
+
+class FakeSyncFolderItems:
+    """Mimics exchangelib 4.1.0 SyncFolderItems: one page per call and the state set while consuming it"""
+
+    instances = []
+
+    def __init__(self, account):
+        self.account = account
+        self.sync_state = None
+        self.includes_last_item_in_range = None
+        self.calls = []
+        FakeSyncFolderItems.instances.append(self)
+
+    def call(self, **kwargs):
+        # Arguments must be accepted by the real service
+        inspect.signature(SyncFolderItems.call).bind(self, **kwargs)
+        self.calls.append(kwargs['sync_state'])
+        folder = kwargs['folder']
+        if kwargs['sync_state'] in folder.bad_states:
+            raise ErrorInvalidSyncStateData('Invalid sync state')
+
+        pos = int(kwargs['sync_state'] or 0)
+        page = folder.items[pos:pos + kwargs['max_changes_returned']]
+        self.sync_state = str(pos + len(page))
+        self.includes_last_item_in_range = pos + len(page) >= len(folder.items)
+        for item in page:
+            if item == 'bad':
+                yield ErrorItemNotFound('Item not found')
+            else:
+                yield 'create', item
+
+
+@pytest.fixture(autouse=True)
+def fake_service(monkeypatch):
+    FakeSyncFolderItems.instances = []
+    monkeypatch.setattr(sync, 'SyncFolderItems', FakeSyncFolderItems)
+
+
+def read_state(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['box@company.com:/root/Inbox']
+
+
+def test_state_is_saved_after_each_page(tmp_path):
+    state_path = str(tmp_path / 'state.json')
+    account = FakeAccount(FakeFolder(25))
+
+    changes = sync.sync_folder_items(account, state_path, max_changes_per_request=10)
+    first = [next(changes)[1] for _ in range(12)]
+
+    # Items are streamed as pages arrive, and the first page was persisted
+    assert first == list(range(12))
+    assert read_state(state_path) == '10'
+
+    # An interrupted poll repeats only its last page
+    assert [item for _, item in sync.sync_folder_items(account, state_path, max_changes_per_request=10)] == \
+        list(range(10, 25))
+    assert read_state(state_path) == '25'
+    assert FakeSyncFolderItems.instances[-1].calls == ['10', '20']
+
+
+def test_item_errors_are_skipped(tmp_path):
+    folder = FakeFolder(0)
+    folder.items = [1, 'bad', 2]
+
+    changes = list(sync.sync_folder_items(FakeAccount(folder), str(tmp_path / 'state.json')))
+
+    assert changes == [('create', 1), ('create', 2)]
+
+
+def test_initial_sync_now_skips_backlog(tmp_path):
+    state_path = str(tmp_path / 'state.json')
+    folder = FakeFolder(25)
+
+    assert list(sync.sync_folder_items(FakeAccount(folder), state_path, max_changes_per_request=10,
+                                       initial_sync='now')) == []
+    assert read_state(state_path) == '25'
+
+    folder.items.append(99)
+    assert list(sync.sync_folder_items(FakeAccount(folder), state_path)) == [('create', 99)]
+
+
+def test_invalid_state_is_reset(tmp_path):
+    state_path = str(tmp_path / 'state.json')
+    sync.save_sync_state(state_path, 'box@company.com:/root/Inbox', 'expired')
+    folder = FakeFolder(3)
+    folder.bad_states.add('expired')
+
+    assert [item for _, item in sync.sync_folder_items(FakeAccount(folder), state_path)] == [0, 1, 2]
+    assert read_state(state_path) == '3'
@@ -0,0 +1,201 @@
+"""
+---------------------------------------------------
+------------------ MODULE: Arrow ------------------
+---------------------------------------------------
+This module allocates useful functions for sending
+Arrow tables, Polars frames and any other object
+exposing the Arrow C data interface without a full
+pandas conversion. Attachments are written straight
+from Arrow buffers as csv or parquet files
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Arrow tables
+    2.1 Detecting and converting tables
+    2.2 Writing attachments
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# Standard python libraries
+import os
+import io
+import pandas as pd
+
+# pyarrow is an optional dependency (pip install xchange_mail[arrow])
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+"""
+---------------------------------------------------
+----------------- 2. ARROW TABLES -----------------
+       2.1 Detecting and converting tables
+---------------------------------------------------
+"""
+
+# Checking if an object is an Arrow compatible table
+def is_arrow_table(obj):
+    """
+    Checks if an object is a table exposing the Arrow C data interface (pyarrow, Polars and others).
+    pandas DataFrames are handled by the pandas path even if they expose the interface
+
+    Parameters
+    ----------
+    :param obj: object to be checked [type: object]
+
+    Return
+    ------
+    :return flag: True if obj can be read as an Arrow table [type: bool]
+    """
+
+    if obj is None or isinstance(obj, pd.DataFrame):
+        return False
+    if pa is not None and isinstance(obj, (pa.Table, pa.RecordBatch)):
+        return True
+
+    return hasattr(obj, '__arrow_c_stream__') or hasattr(obj, '__arrow_c_array__')
+
+# Reading an object as a pyarrow Table
+def to_arrow_table(obj):
+    """
+    Reads an Arrow compatible object as a pyarrow Table. The Arrow C data interface shares the source
+    buffers, so no data is copied
+
+    Parameters
+    ----------
+    :param obj: pyarrow Table/RecordBatch, Polars DataFrame or any object with __arrow_c_stream__ [type: object]
+
+    Return
+    ------
+    :return table: pyarrow Table object [type: pa.Table]
+    """
+
+    if pa is None:
+        raise ImportError('pyarrow is required for sending Arrow tables. Try: pip install pyarrow')
+
+    if isinstance(obj, pa.Table):
+        return obj
+    if isinstance(obj, pa.RecordBatch):
+        return pa.Table.from_batches([obj])
+
+    return pa.table(obj)
+
+# Converting an Arrow table to pandas for rendering it on mail body
+def to_pandas_frame(obj):
+    """
+    Returns a pandas DataFrame for rendering a table on mail body. pretty_html_table only accepts
+    pandas, so Arrow tables are converted here (tables on body are small by nature)
+
+    Parameters
+    ----------
+    :param obj: pandas DataFrame or Arrow compatible table [type: object]
+
+    Return
+    ------
+    :return df: pandas DataFrame object [type: pd.DataFrame]
+    """
+
+    if is_arrow_table(obj):
+        return to_arrow_table(obj).to_pandas()
+
+    return obj
+
+
+"""
+---------------------------------------------------
+----------------- 2. ARROW TABLES -----------------
+             2.2 Writing attachments
+---------------------------------------------------
+"""
+
+# View types (produced by Polars through the C data interface) and the types they are written as
+VIEW_TYPE_CASTS = {pa.string_view(): pa.large_string(), pa.binary_view(): pa.large_binary()} \
+    if pa is not None and hasattr(pa, 'string_view') else {}
+
+# Casting columns that file writers don't support
+def cast_view_types(table):
+    """
+    Casts string_view and binary_view columns to large_string and large_binary, as the CSV writer (and
+    older parquet readers on the recipient side) don't support view types
+
+    Parameters
+    ----------
+    :param table: pyarrow Table object [type: pa.Table]
+
+    Return
+    ------
+    :return table: pyarrow Table object without view types [type: pa.Table]
+    """
+
+    if not any(field.type in VIEW_TYPE_CASTS for field in table.schema):
+        return table
+
+    schema = pa.schema([field.with_type(VIEW_TYPE_CASTS.get(field.type, field.type)) for field in table.schema],
+                       metadata=table.schema.metadata)
+
+    return table.cast(schema)
+
+# Writing an Arrow table on bytes for sending attached
+def buffer_arrow_table(name, obj):
+    """
+    Writes an Arrow compatible table on bytes according to the file extension, straight from Arrow buffers
+
+    Parameters
+    ----------
+    :param name: filename with extension (csv, txt, parquet or xlsx) [type: string]
+    :param obj: Arrow compatible table to be attached [type: object]
+
+    Return
+    ------
+    :return attachment_list: list with name [0] and table content on bytes [1] [type: list]
+    """
+
+    table = cast_view_types(to_arrow_table(obj))
+    file_name, file_ext = os.path.splitext(name)
+
+    sink = pa.BufferOutputStream()
+    if file_ext in ['.csv', '.txt']:
+        pa_csv.write_csv(table, sink)
+    elif file_ext == '.parquet':
+        pq.write_table(table, sink)
+    elif file_ext == '.xlsx':
+        # Excel writers only accept pandas
+        buffer = io.BytesIO()
+        table.to_pandas().to_excel(buffer, index=False)
+        return [name, buffer.getvalue()]
+    else:
+        print('Invalid extension. Options: "csv", "txt", "parquet" e "xlsx"')
+
+    return [name, sink.getvalue().to_pybytes()]
+
+# Returning the size of an Arrow table
+def arrow_nbytes(obj):
+    """
+    Returns the size in bytes of the buffers of an Arrow compatible table
+
+    Parameters
+    ----------
+    :param obj: Arrow compatible table [type: object]
+
+    Return
+    ------
+    :return nbytes: size in bytes [type: int]
+    """
+
+    return int(to_arrow_table(obj).nbytes)
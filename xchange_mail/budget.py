@@ -0,0 +1,256 @@
+"""
+---------------------------------------------------
+----------------- MODULE: Budget ------------------
+---------------------------------------------------
+This module allocates a process wide memory budget
+for concurrent sends. Before building a message,
+its payload (DataFrame buffers, images and files)
+is reserved from the budget. New messages wait
+while the budget is exhausted and the bytes are
+released when the message was sent
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Memory budget
+    2.1 Budget controller
+    2.2 Payload reservation
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# Standard python libraries
+import os
+import re
+import time
+import threading
+from contextlib import contextmanager
+
+# xchange_mail functions
+from xchange_mail.arrow import is_arrow_table, arrow_nbytes
+
+
+"""
+---------------------------------------------------
+---------------- 2. MEMORY BUDGET -----------------
+              2.1 Budget controller
+---------------------------------------------------
+"""
+
+# Each payload byte is held about three times while sending: file buffer, bytes content and base64 request
+PAYLOAD_FACTOR = 3
+
+# Size units accepted on XCHANGE_MAIL_MEMORY_BUDGET environment variable
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+SIZE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?|\.\d+)\s*([KMG])?B?$')
+
+# Parsing a size string
+def parse_size(size):
+    """
+    Transforms a size string like "512M" or "2G" on a number of bytes. Raises ValueError on invalid strings
+
+    Parameters
+    ----------
+    :param size: size in bytes or with K, M or G suffix [type: string or int]
+
+    Return
+    ------
+    :return nbytes: number of bytes or None if size is empty [type: int]
+    """
+
+    if size is None or str(size).strip() == '':
+        return None
+    if isinstance(size, (int, float)):
+        return int(size)
+
+    match = SIZE_PATTERN.match(str(size).strip().upper())
+    if match is None:
+        raise ValueError(f'Invalid size "{size}". Expected a number of bytes with optional K, M or G suffix (e.g. "512M")')
+    number, unit = match.groups()
+
+    return int(float(number) * SIZE_UNITS.get(unit, 1))
+
+# Byte budget shared by threads of a process
+class MemoryBudget:
+    """
+    Controls how many payload bytes can be held at the same time. A reservation bigger than the limit
+    waits until the whole budget is free, so it is never blocked forever
+
+    Parameters
+    ----------
+    :param limit: max number of bytes reserved at the same time (None means no limit) [type: int, default=None]
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.in_use = 0
+        self._condition = threading.Condition()
+
+    @property
+    def enabled(self):
+        return self.limit is not None
+
+    def set_limit(self, limit):
+        """
+        Changes the budget limit, waking up reservations that fit on the new one
+        """
+
+        with self._condition:
+            self.limit = limit
+            self._condition.notify_all()
+
+    def acquire(self, nbytes, timeout=None):
+        """
+        Reserves bytes from budget, waiting while there is no room for them
+
+        Parameters
+        ----------
+        :param nbytes: number of bytes to be reserved [type: int]
+        :param timeout: max seconds waiting (None waits forever) [type: float, default=None]
+
+        Return
+        ------
+        :return granted: number of bytes actually reserved (to be released later) [type: int]
+        """
+
+        with self._condition:
+            if self.limit is None:
+                return 0
+
+            granted = min(int(nbytes), self.limit)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self.in_use + granted > self.limit:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f'Memory budget exhausted: {self.in_use} of {self.limit} bytes in use')
+                self._condition.wait(remaining)
+
+                # The budget may be disabled or changed while waiting
+                if self.limit is None:
+                    return 0
+                granted = min(int(nbytes), self.limit)
+            self.in_use += granted
+
+            return granted
+
+    def release(self, nbytes):
+        """
+        Releases bytes reserved by acquire()
+
+        Parameters
+        ----------
+        :param nbytes: number of bytes returned by acquire() [type: int]
+        """
+
+        if nbytes == 0:
+            return
+        with self._condition:
+            self.in_use = max(0, self.in_use - nbytes)
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes, timeout=None):
+        """
+        Context manager that reserves bytes from budget and releases them on exit
+        """
+
+        granted = self.acquire(nbytes, timeout=timeout)
+        try:
+            yield granted
+        finally:
+            self.release(granted)
+
+
+# Budget of the current process
+_BUDGET = MemoryBudget(parse_size(os.getenv('XCHANGE_MAIL_MEMORY_BUDGET')))
+
+# Returning the budget of the current process
+def get_memory_budget():
+    """
+    Returns the memory budget of the current process
+
+    Return
+    ------
+    :return budget: process wide memory budget [type: MemoryBudget]
+    """
+
+    return _BUDGET
+
+# Changing the budget of the current process
+def set_memory_budget(limit):
+    """
+    Changes the limit of the process wide memory budget
+
+    Parameters
+    ----------
+    :param limit: max number of bytes or size string like "512M" (None means no limit) [type: int or string]
+    """
+
+    _BUDGET.set_limit(parse_size(limit))
+
+
+"""
+---------------------------------------------------
+---------------- 2. MEMORY BUDGET -----------------
+             2.2 Payload reservation
+---------------------------------------------------
+"""
+
+# Estimating the size of a payload object
+def estimate_size(obj):
+    """
+    Estimates the size in bytes of a payload object
+
+    Parameters
+    ----------
+    :param obj: DataFrame, Arrow compatible table, bytes or path to a local file [type: pd.DataFrame, bytes or string]
+
+    Return
+    ------
+    :return nbytes: estimated size in bytes [type: int]
+    """
+
+    if obj is None:
+        return 0
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, str):
+        return os.path.getsize(obj) if os.path.isfile(obj) else 0
+    if hasattr(obj, 'memory_usage'):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if is_arrow_table(obj):
+        return arrow_nbytes(obj)
+
+    return 0
+
+# Reserving the payload of a message
+@contextmanager
+def reserve_payload(*objects, timeout=None):
+    """
+    Reserves the estimated payload of a message from the process budget while it is built and sent.
+    Each message must do a single reservation, so messages never wait holding part of the budget
+
+    Parameters
+    ----------
+    :param *objects: DataFrames, bytes or paths to local files sent on the message
+    :param timeout: max seconds waiting for budget (None waits forever) [type: float, default=None]
+    """
+
+    budget = get_memory_budget()
+    if not budget.enabled:
+        yield 0
+        return
+
+    nbytes = sum(estimate_size(obj) for obj in objects) * PAYLOAD_FACTOR
+    with budget.reserve(nbytes, timeout=timeout) as granted:
+        yield granted
@@ -0,0 +1,655 @@
+"""
+---------------------------------------------------
+-------------------- MODULE: CLI --------------------
+---------------------------------------------------
+This module allocates the console entry point of
+xchange_mail. It reads a manifest with many report
+jobs and distributes them across a pool of worker
+processes, each one holding its own Exchange session
+
+Usage
+---------------------------------------------------
+$ xchange-mail send manifest.yaml --workers 4
+
+Manifest example
+---------------------------------------------------
+workers: 4
+defaults:
+  username: ${MAIL_FROM}
+  password: ${PASSWORD}
+  server: outlook.office365.com
+  mail_box: ${MAIL_BOX}
+  mail_signature: '<br>Att,<br>Desenvolvedores xchange_mail'
+jobs:
+  - name: performances
+    subject: '[xchange_mail] Report HTML por E-mail'
+    mail_to: first@company.com;second@company.com
+    mail_body: 'Processo realizado com sucesso!<br><br>'
+    df_path: data/performances.csv
+    df_on_body: true
+    df_on_attachment: true
+    attachment_filename: performances.csv
+
+Jobs (or defaults) may also define a "senders" list
+of username/password/mail_box entries and a routing
+"policy" for spreading sends over many mail boxes
+
+A "digest" entry (true or a dictionary with subject
+and max_bytes keys) merges jobs sent to the same
+recipients through the same sender on digest mails
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Manifest handling
+    2.1 Reading and preparing jobs
+    2.2 Coalescing jobs on digests
+3. Worker pool
+    3.1 Worker process functions
+    3.2 Command line entry point
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# xchange_mail functions
+from xchange_mail.mail import connect_exchange, send_simple_mail, send_mail_spec
+from xchange_mail.sharding import MailboxPool, create_shared_state
+from xchange_mail.recipients import parse_recipients
+from xchange_mail.spec import MailSpec, AttachmentSpec
+from xchange_mail.digest import DigestScheduler
+
+# Exchangelib classes
+from exchangelib import DELEGATE
+
+# Standard python libraries
+import os
+import re
+import sys
+import inspect
+import json
+import time
+import ntpath
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from multiprocessing import Manager
+from dotenv import load_dotenv, find_dotenv
+import pandas as pd
+import yaml
+
+
+"""
+---------------------------------------------------
+-------------- 2. MANIFEST HANDLING ---------------
+          2.1 Reading and preparing jobs
+---------------------------------------------------
+"""
+
+# Job keys used for getting the pooled account of each worker
+CONNECTION_KEYS = ['username', 'password', 'server', 'mail_box', 'auto_discover', 'access_type']
+
+# Job keys handled by the CLI itself
+CLI_KEYS = ['name', 'df_path', 'mail_body_path', 'senders', 'policy']
+
+# Keys accepted by send_simple_mail through **kwargs
+SEND_KWARGS_KEYS = ['color', 'font_size', 'font_family', 'text_align', 'image_max_width', 'image_quality',
+                    'image_cache_dir']
+
+# Digest settings accepted on manifest
+DIGEST_KEYS = ['subject', 'max_bytes']
+
+# Job keys that must match for jobs to be merged on the same digest
+DIGEST_GROUP_KEYS = CONNECTION_KEYS + ['senders', 'policy', 'resolve_mail_to']
+
+# Table options of jobs kept on digest sections
+TABLE_OPTION_KEYS = ['color', 'font_size', 'font_family', 'text_align']
+
+# Environment variable references expanded on manifest values (only the explicit ${VAR} form, so a
+# literal "$" on passwords, html or currency values like "R$100" is kept as it is)
+ENV_VAR_PATTERN = re.compile(r'\$\{(\w+)\}')
+
+# Expanding environment variables on manifest values
+def expand_env_vars(value):
+    """
+    Recursively replaces ${VAR} references on manifest values by its environment values. References to
+    unset variables are kept as they are (see unresolved_env_vars())
+
+    Parameters
+    ----------
+    :param value: manifest value to be expanded [type: string, list or dict]
+
+    Return
+    ------
+    :return value: manifest value with environment variables expanded [type: string, list or dict]
+    """
+
+    if isinstance(value, str):
+        return ENV_VAR_PATTERN.sub(lambda match: os.environ.get(match.group(1), match.group(0)), value)
+    elif isinstance(value, list):
+        return [expand_env_vars(v) for v in value]
+    elif isinstance(value, dict):
+        return {k: expand_env_vars(v) for k, v in value.items()}
+
+    return value
+
+# Looking for environment variables that couldn't be expanded
+def unresolved_env_vars(value):
+    """
+    Returns the names of environment variables referenced on manifest values that are not set
+
+    Parameters
+    ----------
+    :param value: manifest value before expansion [type: string, list or dict]
+
+    Return
+    ------
+    :return names: names of unset environment variables [type: list]
+    """
+
+    if isinstance(value, str):
+        return [name for name in ENV_VAR_PATTERN.findall(value) if name not in os.environ]
+    elif isinstance(value, list):
+        return [name for v in value for name in unresolved_env_vars(v)]
+    elif isinstance(value, dict):
+        return [name for v in value.values() for name in unresolved_env_vars(v)]
+
+    return []
+
+# Checking job keys against send_simple_mail parameters
+def unknown_job_keys(job):
+    """
+    Returns the job keys that are not accepted by send_simple_mail nor by the CLI
+
+    Parameters
+    ----------
+    :param job: job configuration read from manifest [type: dict]
+
+    Return
+    ------
+    :return keys: unknown keys (usually misspelled ones) [type: list]
+    """
+
+    params = inspect.signature(send_simple_mail).parameters
+    accepted = set(params) - {'kwargs', 'account', 'df'}
+    accepted.update(CLI_KEYS + SEND_KWARGS_KEYS)
+
+    return sorted(key for key in job if key not in accepted)
+
+# Reading manifest file
+def read_manifest(manifest_path):
+    """
+    Reads a yaml (or json) manifest file and returns a list of jobs with defaults applied
+
+    Parameters
+    ----------
+    :param manifest_path: path to manifest file [type: string]
+
+    Return
+    ------
+    :return manifest: dictionary with "workers" [type: int or None], "jobs" [type: list] and "digest"
+        [type: dict or None] keys [type: dict]
+    """
+
+    # Reading file content according to its extension
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        if os.path.splitext(manifest_path)[1] == '.json':
+            content = json.load(f)
+        else:
+            content = yaml.safe_load(f)
+
+    if not isinstance(content, dict) or 'jobs' not in content:
+        raise ValueError(f'Invalid manifest {manifest_path}: a "jobs" list is required')
+
+    # Merging defaults on each job and expanding environment variables
+    defaults = content.get('defaults', None) or {}
+    jobs = []
+    for idx, job in enumerate(content['jobs']):
+        job_config = dict(defaults)
+        job_config.update(job)
+        job_config.setdefault('name', f'job_{idx + 1}')
+
+        # Checking references to unset variables before any substitution
+        unresolved = unresolved_env_vars(job_config)
+        if len(unresolved) > 0:
+            raise ValueError(f'Invalid manifest {manifest_path}: environment variables not set on job '
+                             f'"{job_config["name"]}": {sorted(set(unresolved))}')
+
+        # Relative paths on manifest are relative to the manifest directory
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        for path_key in ['df_path', 'mail_body_path', 'image_location', 'local_attachment_path']:
+            if job_config.get(path_key) is not None:
+                job_config[path_key] = os.path.join(base_dir, expand_env_vars(job_config[path_key]))
+
+        jobs.append(expand_env_vars(job_config))
+
+    # Digest settings: true for default settings or a dictionary with DigestScheduler parameters
+    digest = content.get('digest', None) or None
+    if digest is True:
+        digest = {}
+    if digest is not None:
+        if not isinstance(digest, dict) or any(key not in DIGEST_KEYS for key in digest):
+            raise ValueError(f'Invalid manifest {manifest_path}: "digest" must be true or a dictionary '
+                             f'with {DIGEST_KEYS} keys')
+        unresolved = unresolved_env_vars(digest)
+        if len(unresolved) > 0:
+            raise ValueError(f'Invalid manifest {manifest_path}: environment variables not set on digest: '
+                             f'{sorted(set(unresolved))}')
+        digest = expand_env_vars(digest)
+
+    return {'workers': content.get('workers', None), 'jobs': jobs, 'digest': digest}
+
+
+"""
+---------------------------------------------------
+-------------- 2. MANIFEST HANDLING ---------------
+         2.2 Coalescing jobs on digests
+---------------------------------------------------
+"""
+
+# Reading DataFrame and body template of a job
+def read_job_files(job):
+    """
+    Replaces df_path and mail_body_path keys of a job by the DataFrame and the body template read from disk
+
+    Parameters
+    ----------
+    :param job: job configuration read from manifest [type: dict]
+
+    Return
+    ------
+    :return job: job configuration with "df" and "mail_body" keys if applicable [type: dict]
+    """
+
+    df_path = job.pop('df_path', None)
+    if df_path is not None:
+        job['df'] = pd.read_excel(df_path) if df_path.endswith('.xlsx') else pd.read_csv(df_path)
+    mail_body_path = job.pop('mail_body_path', None)
+    if mail_body_path is not None:
+        with open(mail_body_path, 'r', encoding='utf-8') as f:
+            job['mail_body'] = f.read()
+
+    return job
+
+# Checking if a job can be merged on a digest
+def is_digest_job(job):
+    """
+    Returns True if a job can be a digest section. Jobs with an image on body are sent on their own
+
+    Parameters
+    ----------
+    :param job: job configuration read from manifest [type: dict]
+
+    Return
+    ------
+    :return flag: True if the job can be merged on a digest [type: bool]
+    """
+
+    return not job.get('image_on_body', False)
+
+# Building a mail spec from a job
+def job_to_spec(job):
+    """
+    Builds a MailSpec with the content and attachments of a manifest job
+
+    Parameters
+    ----------
+    :param job: job configuration read from manifest [type: dict]
+
+    Return
+    ------
+    :return spec: mail content and attachments [type: MailSpec]
+    """
+
+    unknown = unknown_job_keys(job)
+    if len(unknown) > 0:
+        raise ValueError(f'Unknown job keys: {unknown}')
+    job = read_job_files(dict(job))
+
+    attachments = []
+    df_on_body = job.get('df_on_body', False)
+    df_on_attachment = job.get('df_on_attachment', False)
+    if job.get('df') is not None and (df_on_body or df_on_attachment):
+        attachments.append(AttachmentSpec(job.get('attachment_filename', 'file.csv'), df=job['df'],
+                                          on_body=df_on_body, on_attachment=df_on_attachment))
+    local_attachment_path = job.get('local_attachment_path', None)
+    if local_attachment_path is not None:
+        attachments.append(AttachmentSpec(ntpath.basename(local_attachment_path), path=local_attachment_path))
+
+    return MailSpec(job['subject'], parse_recipients(job.get('mail_to')), mail_body=job.get('mail_body', ''),
+                    mail_signature=job.get('mail_signature', ''), attachments=attachments,
+                    table_options={k: job[k] for k in TABLE_OPTION_KEYS if k in job})
+
+# Merging jobs on digests
+def build_digests(jobs, subject='Digest: {n} reports', max_bytes=10 * 1024 ** 2):
+    """
+    Merges jobs sent to the same recipients through the same sender on digest mails. Files of each job
+    are read on the current process and the digests are returned as tasks for the worker processes
+
+    Parameters
+    ----------
+    :param jobs: jobs read from manifest [type: list]
+    :param subject: digest subject, where {n} is replaced by the number of reports [type: string, default='Digest: {n} reports']
+    :param max_bytes: size cap of a digest [type: int, default=10485760]
+
+    Return
+    ------
+    :return digests: digest tasks with "name", "spec" and "connection" keys [type: list]
+    :return failed: results of jobs that couldn't be read [type: list]
+    """
+
+    schedulers = {}
+    digests = []
+    failed = []
+    for job in jobs:
+        start = time.perf_counter()
+        try:
+            spec = job_to_spec(job)
+        except Exception as e:
+            failed.append({'name': job['name'], 'ok': False, 'elapsed': time.perf_counter() - start,
+                           'error': repr(e)})
+            continue
+
+        # One scheduler per sender, as DigestScheduler groups only by recipients
+        connection = {k: job[k] for k in DIGEST_GROUP_KEYS if job.get(k) is not None}
+        key = json.dumps(connection, sort_keys=True, default=str)
+        if key not in schedulers:
+            def collect(digest_spec, connection=connection):
+                digests.append({'name': f'{digest_spec.subject} to {";".join(digest_spec.mail_to)}',
+                                'spec': digest_spec, 'connection': connection})
+            schedulers[key] = DigestScheduler(window=0, max_bytes=max_bytes, subject=subject, send_func=collect)
+        schedulers[key].submit(spec)
+
+    for scheduler in schedulers.values():
+        scheduler.flush_all()
+
+    return digests, failed
+
+
+"""
+---------------------------------------------------
+----------------- 3. WORKER POOL ------------------
+          3.1 Worker process functions
+---------------------------------------------------
+"""
+
+# Exchange accounts and sender mail box pools held by each worker process
+_SESSIONS = {}
+_POOLS = {}
+
+# Mail box load and health state shared by all worker processes
+_SHARED_STATE = {'state': None, 'lock': None}
+
+# Initializing worker processes
+def init_worker(shared_state=None, shared_lock=None):
+    """
+    Initializes a worker process by reading environment variables and cleaning its session pool
+
+    Parameters
+    ----------
+    :param shared_state: mail box state shared by all workers [type: DictProxy, default=None]
+    :param shared_lock: lock guarding the shared state [type: AcquirerProxy, default=None]
+    """
+
+    load_dotenv(find_dotenv(usecwd=True))
+    _SESSIONS.clear()
+    _POOLS.clear()
+    _SHARED_STATE['state'] = shared_state
+    _SHARED_STATE['lock'] = shared_lock
+
+# Returning the pooled account of the current process
+def get_session(username, password, server, mail_box, auto_discover=False, access_type=DELEGATE):
+    """
+    Returns the Account object of the current process for the given credentials, connecting only once
+
+    Parameters
+    ----------
+    :param username: user mail with rights for sending mails through the mail box provided [type: string]
+    :param password: user passwords smtp [type: string]
+    :param server: server for managing the mail sending [type: string]
+    :param mail_box: primary address associated to the user account [type: string]
+    :param auto_discover: flag for pointing to EWS using a specific protocol [type: bool, default=False]
+    :param access_type: access type associated to the credentials provided [type: string, default=DELEGATE]
+        *options: "delegate" or "impersonation"
+
+    Return
+    ------
+    :return account: exchange object with user account information [type: Account]
+    """
+
+    key = (username, server, mail_box, access_type)
+    if key not in _SESSIONS:
+        _SESSIONS[key] = connect_exchange(username=username, password=password, server=server,
+                                          mail_box=mail_box, auto_discover=auto_discover,
+                                          access_type=access_type)
+
+    return _SESSIONS[key]
+
+# Returning the sender mail box pool of the current process
+def get_mailbox_pool(senders, server, policy='least_loaded', access_type=DELEGATE):
+    """
+    Returns the MailboxPool of the current process for the given sender identities, creating it only once.
+    Pools of all workers share mail box load and health, so throttling and load are seen by every process
+
+    Parameters
+    ----------
+    :param senders: sender identities with "username", "password" and "mail_box" keys [type: list]
+    :param server: server for managing the mail sending [type: string]
+    :param policy: routing policy of the pool [type: string, default='least_loaded']
+    :param access_type: access type associated to the credentials provided [type: string, default=DELEGATE]
+
+    Return
+    ------
+    :return pool: pool of sender identities [type: MailboxPool]
+    """
+
+    identities = tuple((s['username'], s['password'], s['mail_box']) for s in senders)
+    key = (identities, server, policy, access_type)
+    if key not in _POOLS:
+        _POOLS[key] = MailboxPool(list(identities), server=server, policy=policy, access_type=access_type,
+                                  shared_state=_SHARED_STATE['state'], shared_lock=_SHARED_STATE['lock'])
+
+    return _POOLS[key]
+
+# Running a single job
+def run_job(job):
+    """
+    Sends a single manifest job using the pooled account of the current process
+
+    Parameters
+    ----------
+    :param job: job configuration read from manifest [type: dict]
+
+    Return
+    ------
+    :return result: dictionary with job name, status, elapsed time and error message [type: dict]
+    """
+
+    start = time.perf_counter()
+    job = dict(job)
+    name = job.pop('name')
+    try:
+        # Misspelled keys would be silently ignored by send_simple_mail
+        unknown = unknown_job_keys(job)
+        if len(unknown) > 0:
+            raise ValueError(f'Unknown job keys: {unknown}')
+
+        # Reading DataFrame and body template if applicable
+        job = read_job_files(job)
+
+        # Accepting recipients separated by semicolon
+        job['mail_to'] = parse_recipients(job.get('mail_to'))
+
+        # Sending mail through the sender mail box pool or through the pooled account
+        senders = job.pop('senders', None)
+        policy = job.pop('policy', 'least_loaded')
+        if senders is not None:
+            pool = get_mailbox_pool(senders, server=job['server'], policy=policy,
+                                    access_type=job.get('access_type', DELEGATE))
+            mail_box = pool.send(**{k: v for k, v in job.items() if k not in CONNECTION_KEYS})
+            sent = mail_box is not None
+            name = f'{name} via {mail_box}' if sent else name
+        else:
+            account = get_session(**{k: job[k] for k in CONNECTION_KEYS if k in job})
+            sent = send_simple_mail(account=account, **job)
+        if sent is False:
+            raise RuntimeError('Mail not sent: no valid recipients left')
+
+        return {'name': name, 'ok': True, 'elapsed': time.perf_counter() - start, 'error': None}
+    except Exception as e:
+        return {'name': name, 'ok': False, 'elapsed': time.perf_counter() - start, 'error': repr(e)}
+
+# Sending a mail spec through a sender mail box pool (MailboxPool passes the recipients apart)
+def send_pooled_spec(spec, mail_to=None, **kwargs):
+    return send_mail_spec(spec, **kwargs)
+
+# Running a single digest
+def run_digest(digest):
+    """
+    Sends a digest built by build_digests() using the pooled account of the current process
+
+    Parameters
+    ----------
+    :param digest: digest task with "name", "spec" and "connection" keys [type: dict]
+
+    Return
+    ------
+    :return result: dictionary with digest name, status, elapsed time and error message [type: dict]
+    """
+
+    start = time.perf_counter()
+    name = digest['name']
+    spec = digest['spec']
+    connection = dict(digest['connection'])
+    try:
+        # Sending digest through the sender mail box pool or through the pooled account
+        senders = connection.pop('senders', None)
+        policy = connection.pop('policy', 'least_loaded')
+        resolve_mail_to = connection.pop('resolve_mail_to', False)
+        if senders is not None:
+            pool = get_mailbox_pool(senders, server=connection['server'], policy=policy,
+                                    access_type=connection.get('access_type', DELEGATE))
+            mail_box = pool.send(spec.mail_to, send_func=send_pooled_spec, spec=spec,
+                                 resolve_mail_to=resolve_mail_to)
+            sent = mail_box is not None
+            name = f'{name} via {mail_box}' if sent else name
+        else:
+            account = get_session(**connection)
+            sent = send_mail_spec(spec, account=account, resolve_mail_to=resolve_mail_to)
+        if sent is False:
+            raise RuntimeError('Mail not sent: no valid recipients left')
+
+        return {'name': name, 'ok': True, 'elapsed': time.perf_counter() - start, 'error': None}
+    except Exception as e:
+        return {'name': name, 'ok': False, 'elapsed': time.perf_counter() - start, 'error': repr(e)}
+
+
+"""
+---------------------------------------------------
+----------------- 3. WORKER POOL ------------------
+          3.2 Command line entry point
+---------------------------------------------------
+"""
+
+# Sending all manifest jobs through a process pool
+def send_manifest(manifest_path, workers=None):
+    """
+    Distributes all manifest jobs across a process pool and prints a throughput summary at the end
+
+    Parameters
+    ----------
+    :param manifest_path: path to manifest file [type: string]
+    :param workers: number of worker processes (overrides the manifest value) [type: int, default=None]
+
+    Return
+    ------
+    :return results: list with one result dictionary per job [type: list]
+    """
+
+    manifest = read_manifest(manifest_path)
+    jobs = manifest['jobs']
+    start = time.perf_counter()
+    results = []
+
+    # Merging jobs with the same recipients on digests if applicable
+    tasks = [(run_job, job) for job in jobs]
+    if manifest['digest'] is not None:
+        digest_jobs = [job for job in jobs if is_digest_job(job)]
+        digests, results = build_digests(digest_jobs, **manifest['digest'])
+        for result in results:
+            print(f'[{result["name"]}] FAILED ({result["error"]}) in {result["elapsed"]:.2f}s')
+        print(f'Digest: {len(digest_jobs) - len(results)} jobs merged on {len(digests)} mails')
+        tasks = [(run_job, job) for job in jobs if not is_digest_job(job)] + \
+                [(run_digest, digest) for digest in digests]
+
+    workers = workers or manifest['workers'] or os.cpu_count()
+    workers = max(1, min(workers, len(tasks))) if tasks else 1
+
+    # Submitting jobs and collecting results as they finish
+    with ExitStack() as stack:
+        # Mail box load and health are shared by all workers through a manager process
+        initargs = ()
+        if any(job.get('senders') is not None for job in jobs):
+            manager = stack.enter_context(Manager())
+            initargs = create_shared_state(manager)
+
+        executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                                           initargs=initargs))
+        futures = [executor.submit(func, task) for func, task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = 'OK' if result['ok'] else f'FAILED ({result["error"]})'
+            print(f'[{result["name"]}] {status} in {result["elapsed"]:.2f}s')
+    elapsed = time.perf_counter() - start
+
+    # Throughput summary
+    sent = sum(1 for r in results if r['ok'])
+    rate = sent / elapsed if elapsed > 0 else 0.0
+    print(f'Summary: {len(results)} jobs | {sent} sent | {len(results) - sent} failed | '
+          f'{workers} workers | {elapsed:.2f}s | {rate:.2f} mails/s')
+
+    return results
+
+# Console entry point
+def main(argv=None):
+    """
+    Console entry point of xchange_mail (xchange-mail send manifest.yaml)
+
+    Parameters
+    ----------
+    :param argv: command line arguments [type: list, default=None]
+
+    Return
+    ------
+    :return exit_code: 0 if all jobs were sent, 1 otherwise [type: int]
+    """
+
+    parser = argparse.ArgumentParser(prog='xchange-mail', description='Sending mails via MS Exchange')
+    subparsers = parser.add_subparsers(dest='command')
+    send_parser = subparsers.add_parser('send', help='sends all report jobs of a manifest file')
+    send_parser.add_argument('manifest', help='path to yaml or json manifest file')
+    send_parser.add_argument('-w', '--workers', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    if args.command != 'send':
+        parser.print_help()
+        return 1
+
+    load_dotenv(find_dotenv(usecwd=True))
+    results = send_manifest(args.manifest, workers=args.workers)
+
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+---------------------------------------------------
+------------------ MODULE: Delta ------------------
+---------------------------------------------------
+This module allocates useful functions for sending
+only what changed on recurring reports. The last
+sent DataFrame of each report is kept on a local
+snapshot store (a parquet file with the rows and
+their hashes) and the next send attaches only the rows
+added, removed or changed since then
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Delta reports
+    2.1 Snapshot store
+    2.2 Computing deltas
+    2.3 Sending deltas
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# xchange_mail functions
+from xchange_mail.mail import send_simple_mail
+from xchange_mail.arrow import to_pandas_frame
+
+# Standard python libraries
+import os
+import re
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+from pretty_html_table import build_table
+
+# pyarrow is an optional dependency (pip install xchange_mail[delta])
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+"""
+---------------------------------------------------
+---------------- 2. DELTA REPORTS -----------------
+               2.1 Snapshot store
+---------------------------------------------------
+"""
+
+# Name of the column that flags each delta row
+CHANGE_COL = 'change_type'
+
+# Hash columns stored with the snapshot rows
+HASH_COLS = ['_key_hash', '_row_hash']
+
+# Parquet schema metadata key with the key columns used for hashing the snapshot
+KEY_COLS_METADATA = b'xchange_mail.key_cols'
+
+# Returning the snapshot path of a report
+def snapshot_path(report_key, store_dir):
+    """
+    Returns the path of the snapshot of a report
+
+    Parameters
+    ----------
+    :param report_key: unique key of a recurring report [type: string]
+    :param store_dir: snapshot store directory [type: string]
+
+    Return
+    ------
+    :return path: path to parquet file with the last sent DataFrame and its row hashes [type: string]
+    """
+
+    name = re.sub(r'[^\w\-.]', '_', report_key)
+
+    return os.path.join(store_dir, f'{name}.parquet')
+
+# Hashing DataFrame rows
+def hash_rows(df, key_cols=None):
+    """
+    Computes vectorized hashes of each DataFrame row and of its key columns
+
+    Parameters
+    ----------
+    :param df: DataFrame object [type: pd.DataFrame]
+    :param key_cols: columns that identify a row (if None, the whole row is the key) [type: list, default=None]
+
+    Return
+    ------
+    :return index: DataFrame with "key_hash" and "row_hash" columns, one line per row of df [type: pd.DataFrame]
+    """
+
+    row_hash = pd.util.hash_pandas_object(df, index=False).values
+    key_hash = pd.util.hash_pandas_object(df[key_cols], index=False).values if key_cols else row_hash
+
+    return pd.DataFrame({'key_hash': key_hash, 'row_hash': row_hash})
+
+# Reading the row hashes of a snapshot
+def load_snapshot_index(path):
+    """
+    Reads only the hash columns of a snapshot (parquet files are read by column)
+
+    Parameters
+    ----------
+    :param path: snapshot path returned by snapshot_path() [type: string]
+
+    Return
+    ------
+    :return index: DataFrame with "key_hash" and "row_hash" columns [type: pd.DataFrame]
+    """
+
+    index = pd.read_parquet(path, columns=HASH_COLS)
+    index.columns = ['key_hash', 'row_hash']
+
+    return index
+
+# Reading the key columns of a snapshot
+def load_snapshot_key_cols(path):
+    """
+    Reads the key columns used when a snapshot was saved (stored on parquet schema metadata)
+
+    Parameters
+    ----------
+    :param path: snapshot path returned by snapshot_path() [type: string]
+
+    Return
+    ------
+    :return key_cols: key columns or None if the whole row was the key [type: list]
+    """
+
+    metadata = pq.read_schema(path).metadata or {}
+
+    return json.loads(metadata.get(KEY_COLS_METADATA, b'null'))
+
+# Saving a report snapshot
+def save_snapshot(df, report_key, store_dir, key_cols=None):
+    """
+    Stores the sent DataFrame and its row hashes as the new snapshot of a report. Rows and hashes are
+    kept on a single file written on a temporary file first, so they never get out of sync. The key
+    columns are stored on the file metadata, so a later run with different ones is detected
+
+    Parameters
+    ----------
+    :param df: DataFrame object (or Arrow compatible table) that was sent [type: pd.DataFrame]
+    :param report_key: unique key of a recurring report [type: string]
+    :param store_dir: snapshot store directory [type: string]
+    :param key_cols: columns that identify a row [type: list, default=None]
+    """
+
+    if pa is None:
+        raise ImportError('pyarrow is required for delta reports. Try: pip install pyarrow')
+
+    os.makedirs(store_dir, exist_ok=True)
+    path = snapshot_path(report_key, store_dir)
+    df = to_pandas_frame(df).reset_index(drop=True)
+    index = hash_rows(df, key_cols=key_cols)
+    snapshot = df.assign(**{HASH_COLS[0]: index['key_hash'].values, HASH_COLS[1]: index['row_hash'].values})
+    table = pa.Table.from_pandas(snapshot, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[KEY_COLS_METADATA] = json.dumps(list(key_cols) if key_cols else None).encode()
+
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, suffix='.tmp')
+    os.close(fd)
+    try:
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+"""
+---------------------------------------------------
+---------------- 2. DELTA REPORTS -----------------
+              2.2 Computing deltas
+---------------------------------------------------
+"""
+
+# Computing rows added, removed and changed since the last snapshot
+def compute_delta(df, report_key, store_dir, key_cols=None):
+    """
+    Compares a DataFrame with the last snapshot of a report using row hashes. When key_cols is None,
+    a changed row is returned as one removed and one added row. A snapshot saved with other key_cols
+    is discarded (with a warning) and all rows are taken as added
+
+    Parameters
+    ----------
+    :param df: current DataFrame object (or Arrow compatible table) of the report [type: pd.DataFrame]
+    :param report_key: unique key of a recurring report [type: string]
+    :param store_dir: snapshot store directory [type: string]
+    :param key_cols: columns that identify a row [type: list, default=None]
+
+    Return
+    ------
+    :return delta: rows of df added or changed and old rows removed, flagged by CHANGE_COL [type: pd.DataFrame]
+    :return summary: DataFrame with the number of rows on each change type [type: pd.DataFrame]
+    """
+
+    df = to_pandas_frame(df).reset_index(drop=True)
+    path = snapshot_path(report_key, store_dir)
+    new_index = hash_rows(df, key_cols=key_cols)
+
+    # A snapshot saved with other key columns can't be compared, as its key hashes were built from them
+    has_snapshot = os.path.exists(path)
+    if has_snapshot:
+        snapshot_key_cols = load_snapshot_key_cols(path)
+        if snapshot_key_cols != (list(key_cols) if key_cols else None):
+            print(f'Report {report_key} snapshot was saved with key_cols={snapshot_key_cols} and now '
+                  f'key_cols={key_cols}. The snapshot is discarded and all rows are taken as added')
+            has_snapshot = False
+
+    # Without snapshot, all rows are new
+    if not has_snapshot:
+        added = np.ones(len(df), dtype=bool)
+        changed = np.zeros(len(df), dtype=bool)
+        removed_rows = df.iloc[0:0]
+    else:
+        old_index = load_snapshot_index(path)
+        removed = ~np.isin(old_index['key_hash'].values, new_index['key_hash'].values)
+
+        # Looking for the old row of each key (-1 means a new key)
+        old_unique = old_index.drop_duplicates('key_hash')
+        positions = pd.Index(old_unique['key_hash'].values).get_indexer(new_index['key_hash'].values)
+        added = positions == -1
+
+        # Rows with same key and a different content were changed
+        old_row_hash = old_unique['row_hash'].values[positions[~added]]
+        changed = np.zeros(len(df), dtype=bool)
+        changed[~added] = old_row_hash != new_index['row_hash'].values[~added]
+
+        # Reading old rows only if any of them was removed
+        if removed.any():
+            removed_rows = pd.read_parquet(path).drop(columns=HASH_COLS).iloc[np.flatnonzero(removed)]
+        else:
+            removed_rows = df.iloc[0:0]
+
+    # Building delta and summary
+    delta = pd.concat([df[added].assign(**{CHANGE_COL: 'added'}),
+                       df[changed].assign(**{CHANGE_COL: 'changed'}),
+                       removed_rows.assign(**{CHANGE_COL: 'removed'})], ignore_index=True)
+    summary = pd.DataFrame({CHANGE_COL: ['added', 'changed', 'removed', 'unchanged'],
+                            'rows': [int(added.sum()), int(changed.sum()), len(removed_rows),
+                                     int(len(df) - added.sum() - changed.sum())]})
+
+    return delta, summary
+
+
+"""
+---------------------------------------------------
+---------------- 2. DELTA REPORTS -----------------
+               2.3 Sending deltas
+---------------------------------------------------
+"""
+
+# Sending only what changed on a recurring report
+def send_delta_mail(report_key, df, store_dir, key_cols=None, mail_body='', attachment_filename='delta.csv',
+                    skip_if_unchanged=True, send_func=send_simple_mail, **kwargs):
+    """
+    Sends a mail with only the rows that changed since the last sent snapshot attached and a summary
+    table of the changes on body. The snapshot is updated only when send_func confirms the mail was sent
+
+    Parameters
+    ----------
+    :param report_key: unique key of a recurring report [type: string]
+    :param df: current DataFrame object (or Arrow compatible table) of the report [type: pd.DataFrame]
+    :param store_dir: snapshot store directory [type: string]
+    :param key_cols: columns that identify a row [type: list, default=None]
+    :param mail_body: body raw string or html code, placed before the summary table [type: string, default='']
+    :param attachment_filename: filename for attached delta [type: string, default='delta.csv']
+    :param skip_if_unchanged: flag for not sending a mail if nothing changed [type: bool, default=True]
+    :param send_func: xchange_mail sending function returning True if the mail was sent [type: function, default=send_simple_mail]
+    :param **kwargs: additional parameters passed to send_func (username, password, subject and so on)
+        :arg color: color configuration from pretty_html_table [type: string, default='blue_light']
+        :arg font_size: font size for html table built from DataFrame [type: string, default='medium']
+        :arg font_family: font family for html table built from DataFrame [type: string, default='Century Gothic']
+        :arg text_align: text allign for html table built from DataFrame [type: string, default='left']
+
+    Return
+    ------
+    :return summary: DataFrame with the number of rows on each change type [type: pd.DataFrame]
+    """
+
+    # Arrow tables and Polars frames are converted once, as row hashes are computed by pandas
+    df = to_pandas_frame(df)
+    delta, summary = compute_delta(df, report_key, store_dir, key_cols=key_cols)
+    if len(delta) == 0 and skip_if_unchanged:
+        print(f'Report {report_key} has no changes since the last snapshot. The mail will not be sent')
+        return summary
+
+    # Building the summary table on body
+    html_summary = build_table(summary,
+                               color=kwargs['color'] if 'color' in kwargs else 'blue_light',
+                               font_size=kwargs['font_size'] if 'font_size' in kwargs else 'medium',
+                               font_family=kwargs['font_family'] if 'font_family' in kwargs else 'Century Gothic',
+                               text_align=kwargs['text_align'] if 'text_align' in kwargs else 'left')
+
+    # Sending delta attached and updating snapshot only if the mail was sent
+    sent = send_func(mail_body=mail_body + html_summary, df=delta, df_on_body=False,
+                     df_on_attachment=len(delta) > 0, attachment_filename=attachment_filename, **kwargs)
+    if not sent:
+        print(f'Report {report_key} was not sent. The snapshot will not be updated')
+        return summary
+    save_snapshot(df, report_key, store_dir, key_cols=key_cols)
+
+    return summary
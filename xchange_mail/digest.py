@@ -0,0 +1,313 @@
+"""
+---------------------------------------------------
+----------------- MODULE: Digest ------------------
+---------------------------------------------------
+This module allocates a scheduler for coalescing
+mails sent to the same recipients. Pending mails
+are collected per recipients set during a window
+and merged on a single digest mail with one section
+per report, cutting the number of sends (and the
+inbox noise) per recipient
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Digest mails
+    2.1 Merging mail specs
+    2.2 Coalescing scheduler
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# xchange_mail functions
+from xchange_mail.mail import send_mail_spec, format_html_body
+from xchange_mail.spec import MailSpec, AttachmentSpec
+from xchange_mail.recipients import parse_recipients
+from xchange_mail.budget import estimate_size
+
+# Standard python libraries
+import html
+import time
+import ntpath
+import threading
+
+
+"""
+---------------------------------------------------
+----------------- 2. DIGEST MAILS -----------------
+             2.1 Merging mail specs
+---------------------------------------------------
+"""
+
+# Estimating the size of a mail spec
+def spec_size(spec):
+    """
+    Estimates the size in bytes of a mail spec (body plus DataFrames and files)
+
+    Parameters
+    ----------
+    :param spec: mail content and attachments [type: MailSpec]
+
+    Return
+    ------
+    :return nbytes: estimated size in bytes [type: int]
+    """
+
+    nbytes = len(spec.mail_body or '')
+    for a in spec.attachments:
+        nbytes += estimate_size(a.df if a.df is not None else (a.content if a.content is not None else a.path))
+
+    return nbytes
+
+# Merging many mail specs on a digest
+def merge_specs(specs, subject='Digest: {n} reports'):
+    """
+    Merges mail specs sent to the same recipients on a single digest mail. Each spec becomes a section
+    with its subject as heading, its tables on body and its own signature. Attachments with repeated
+    names get a prefix
+
+    Parameters
+    ----------
+    :param specs: mail specs with the same recipients [type: list]
+    :param subject: digest subject, where {n} is replaced by the number of reports [type: string, default='Digest: {n} reports']
+
+    Return
+    ------
+    :return spec: digest mail spec (the spec itself if there is only one) [type: MailSpec]
+    """
+
+    if len(specs) == 1:
+        return specs[0]
+
+    sections = []
+    attachments = []
+    names = set()
+    for idx, spec in enumerate(specs, start=1):
+        # Rendering each section with its own tables on body and its own signature
+        body_dfs = [a.df for a in spec.attachments if a.on_body and a.df is not None]
+        if len(body_dfs) > 0:
+            section_body = format_html_body(spec.mail_body, df=body_dfs, mail_signature=spec.mail_signature or '',
+                                            **spec.table_options)
+        else:
+            section_body = (spec.mail_body or '') + (spec.mail_signature or '')
+        sections.append(f'<h2>{html.escape(spec.subject)}</h2>{section_body}')
+
+        # Keeping attachments with unique names
+        for a in spec.attachments:
+            if not a.on_attachment:
+                continue
+            name = a.name if a.name not in names else f'{idx}_{a.name}'
+            names.add(name)
+            attachments.append(AttachmentSpec(name, df=a.df, content=a.content, path=a.path,
+                                              on_body=False, on_attachment=True))
+
+    # Signatures are already on each section
+    return MailSpec(subject.format(n=len(specs)), parse_recipients(specs[0].mail_to),
+                    mail_body='<br>'.join(sections), attachments=attachments)
+
+
+"""
+---------------------------------------------------
+----------------- 2. DIGEST MAILS -----------------
+            2.2 Coalescing scheduler
+---------------------------------------------------
+"""
+
+# Coalescing mails per recipients set
+class DigestScheduler:
+    """
+    Collects pending mails per recipients set during a window and sends them as a single digest mail
+
+    Parameters
+    ----------
+    :param window: seconds a recipients set collects mails before its digest is sent [type: int, default=3600]
+    :param max_bytes: size cap of a digest. A mail that exceeds it sends the pending digest first [type: int, default=10485760]
+    :param subject: digest subject, where {n} is replaced by the number of reports [type: string, default='Digest: {n} reports']
+    :param send_func: function that sends a MailSpec [type: function, default=send_mail_spec]
+    :param **send_kwargs: additional parameters passed to send_func (username, password, account and so on)
+    """
+
+    def __init__(self, window=3600, max_bytes=10 * 1024 ** 2, subject='Digest: {n} reports',
+                 send_func=send_mail_spec, **send_kwargs):
+        self.window = window
+        self.max_bytes = max_bytes
+        self.subject = subject
+        self.send_func = send_func
+        self.send_kwargs = send_kwargs
+        self.groups = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, spec):
+        """
+        Adds a mail to the pending digest of its recipients set
+
+        Parameters
+        ----------
+        :param spec: mail content and attachments [type: MailSpec]
+        """
+
+        # Keeping the parsed list on the spec, as exchangelib iterates a string character by character
+        spec.mail_to = parse_recipients(spec.mail_to)
+        key = frozenset(mail.lower() for mail in spec.mail_to)
+        size = spec_size(spec)
+        full_group = None
+        with self._lock:
+            group = self.groups.get(key, None)
+
+            # Sending the pending digest first if the new mail doesn't fit on it
+            if group is not None and group['size'] + size > self.max_bytes:
+                full_group = self.groups.pop(key)
+                group = None
+            if group is None:
+                group = {'specs': [], 'size': 0, 'deadline': time.monotonic() + self.window}
+                self.groups[key] = group
+            group['specs'].append(spec)
+            group['size'] += size
+
+        if full_group is not None:
+            self._send_groups([(key, full_group)])
+
+    def submit_simple(self, subject, mail_to, mail_body='', mail_signature='', df=None, df_on_body=False,
+                      df_on_attachment=False, attachment_filename='file.csv', local_attachment_path=None):
+        """
+        Adds a mail to the pending digest using the same parameters of send_simple_mail()
+
+        Parameters
+        ----------
+        :param subject: mail subject [type: string]
+        :param mail_to: recipients list [type: list]
+        :param mail_body: body raw string or html code [type: string, default='']
+        :param mail_signature: raw string or html code to be put at the end of body [type: string, default='']
+        :param df: DataFrame object that can be sent attached or on mail body [type: pd.DataFrame, default=None]
+        :param df_on_body: flag for sending DataFrame on mail body as a custom table [type: bool, default=False]
+        :param df_on_attachment: flag for sending DataFrame file attached [type: bool, default=False]
+        :param attachment_filename: filename for attached DataFrame [type: string, default='file.csv']
+        :param local_attachment_path: path to file to be attached [type: string, default=None]
+        """
+
+        attachments = []
+        if df is not None and (df_on_body or df_on_attachment):
+            attachments.append(AttachmentSpec(attachment_filename, df=df, on_body=df_on_body,
+                                              on_attachment=df_on_attachment))
+        if local_attachment_path is not None:
+            attachments.append(AttachmentSpec(ntpath.basename(local_attachment_path), path=local_attachment_path))
+
+        self.submit(MailSpec(subject, mail_to, mail_body=mail_body, mail_signature=mail_signature,
+                             attachments=attachments))
+
+    def _send_groups(self, groups):
+        # Each digest is sent on its own, so a failure doesn't drop the other ones
+        sent = 0
+        errors = []
+        for key, group in groups:
+            try:
+                self.send_func(merge_specs(group['specs'], subject=self.subject), **self.send_kwargs)
+                sent += 1
+            except Exception as e:
+                errors.append(e)
+                self._requeue(key, group)
+
+        # Raising the first error only after all other digests were sent
+        if len(errors) > 0:
+            raise RuntimeError(f'{len(errors)} of {len(groups)} digests failed and were kept pending. '
+                               f'First exception: {errors[0]!r}') from errors[0]
+
+        return sent
+
+    def _requeue(self, key, group):
+        # Putting a failed digest back (before any mail submitted meanwhile), so it is sent on the next flush
+        with self._lock:
+            pending = self.groups.get(key, None)
+            if pending is not None:
+                group = {'specs': group['specs'] + pending['specs'], 'size': group['size'] + pending['size'],
+                         'deadline': min(group['deadline'], pending['deadline'])}
+            self.groups[key] = group
+
+    def flush_due(self):
+        """
+        Sends the digests whose window has finished. Digests that fail are kept pending and a
+        RuntimeError is raised after all other digests were sent
+
+        Return
+        ------
+        :return sent: number of digests sent [type: int]
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            due = [key for key, group in self.groups.items() if group['deadline'] <= now]
+            groups = [(key, self.groups.pop(key)) for key in due]
+
+        return self._send_groups(groups)
+
+    def flush_all(self):
+        """
+        Sends all pending digests, even if their window hasn't finished. Digests that fail are kept
+        pending and a RuntimeError is raised after all other digests were sent
+
+        Return
+        ------
+        :return sent: number of digests sent [type: int]
+        """
+
+        with self._lock:
+            groups = list(self.groups.items())
+            self.groups.clear()
+
+        return self._send_groups(groups)
+
+    def start(self, interval=30):
+        """
+        Starts a background thread that sends due digests every interval seconds
+
+        Parameters
+        ----------
+        :param interval: seconds between checks [type: int, default=30]
+        """
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.flush_due()
+                except Exception as e:
+                    # Failed digests stay pending and are sent again on the next check
+                    print(f'Error on sending digest. Exception: {e}')
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='xchange_mail-digest', daemon=True)
+        self._thread.start()
+
+    def stop(self, flush=True):
+        """
+        Stops the background thread, sending all pending digests if applicable
+
+        Parameters
+        ----------
+        :param flush: flag for sending pending digests [type: bool, default=True]
+        """
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush_all()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop(flush=True)
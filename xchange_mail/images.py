@@ -0,0 +1,184 @@
+"""
+---------------------------------------------------
+----------------- MODULE: Images ------------------
+---------------------------------------------------
+This module allocates useful functions for reducing
+the size of images embedded on mail body. Images
+can be downscaled to a max display width, compressed
+again and stripped of metadata. Processed variants
+are stored on a disk cache keyed by the source hash
+and the processing settings
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Image optimization
+    2.1 Disk cache
+    2.2 Processing images
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# Standard python libraries
+import os
+import io
+import json
+import hashlib
+import tempfile
+
+# Pillow is an optional dependency (pip install xchange_mail[images])
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+
+"""
+---------------------------------------------------
+-------------- 2. IMAGE OPTIMIZATION --------------
+                 2.1 Disk cache
+---------------------------------------------------
+"""
+
+# Default cache directory (can be changed by XCHANGE_MAIL_IMAGE_CACHE environment variable)
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'xchange_mail_images')
+
+# Version of the processing steps (part of the cache key, so older variants are not reused)
+CACHE_VERSION = 2
+
+# Building the cache key of a processed image
+def image_cache_key(content, settings):
+    """
+    Returns a key built from the source image hash and the processing settings
+
+    Parameters
+    ----------
+    :param content: source image content [type: bytes]
+    :param settings: processing settings [type: dict]
+
+    Return
+    ------
+    :return key: sha256 hex digest [type: string]
+    """
+
+    hasher = hashlib.sha256(content)
+    hasher.update(json.dumps(settings, sort_keys=True).encode())
+
+    return hasher.hexdigest()
+
+# Writing a processed image on cache
+def write_cache(path, content):
+    """
+    Writes a file on cache using a unique temporary file, so concurrent readers never see partial content
+    and concurrent writers (threads or processes) never share a temporary file. A failed write is only
+    logged, as the content was already processed
+
+    Parameters
+    ----------
+    :param path: cache file path [type: string]
+    :param content: processed image content [type: bytes]
+    """
+
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f'Error on writing image cache {path}. Exception: {e}')
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+"""
+---------------------------------------------------
+-------------- 2. IMAGE OPTIMIZATION --------------
+              2.2 Processing images
+---------------------------------------------------
+"""
+
+# Optimizing an image to be embedded on mail body
+def optimize_image(image_location, max_width=None, quality=85, strip_metadata=True, cache_dir=None):
+    """
+    Downscales, compresses again and strips metadata of an image, using a disk cache for processed variants
+
+    Parameters
+    ----------
+    :param image_location: location of image stored on disk [type: string]
+    :param max_width: max display width in pixels (None keeps the original width) [type: int, default=None]
+    :param quality: JPEG/WEBP quality (PNG files are saved with optimize flag) [type: int, default=85]
+    :param strip_metadata: flag for removing EXIF data and ICC profile [type: bool, default=True]
+    :param cache_dir: cache directory [type: string, default=None]
+        *if None, uses XCHANGE_MAIL_IMAGE_CACHE environment variable or a temporary directory
+
+    Return
+    ------
+    :return content: processed image content [type: bytes]
+    """
+
+    if Image is None:
+        raise ImportError('Pillow is required for optimizing images. Try: pip install Pillow')
+
+    with open(image_location, 'rb') as f:
+        source = f.read()
+
+    # Returning processed variant from cache if applicable
+    settings = {'version': CACHE_VERSION, 'max_width': max_width, 'quality': quality, 'strip_metadata': strip_metadata}
+    cache_dir = cache_dir or os.getenv('XCHANGE_MAIL_IMAGE_CACHE', DEFAULT_CACHE_DIR)
+    cache_path = os.path.join(cache_dir, image_cache_key(source, settings))
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            return f.read()
+
+    # Rotating pixels according to EXIF orientation, as the tag is lost when metadata is stripped
+    img = Image.open(io.BytesIO(source))
+    img_format = img.format
+    if strip_metadata:
+        img = ImageOps.exif_transpose(img)
+
+    # Downscaling image keeping its aspect ratio
+    resized = False
+    if max_width is not None and img.width > max_width:
+        height = max(1, round(img.height * max_width / img.width))
+        img = img.resize((max_width, height), getattr(Image, 'Resampling', Image).LANCZOS)
+        resized = True
+
+    # Compressing again according to image format. Metadata is passed explicitly, as some writers
+    # (like PNG) copy the ICC profile from the source image by default
+    save_params = {'format': img_format, 'optimize': True}
+    if img_format in ['JPEG', 'WEBP']:
+        save_params['quality'] = quality
+    if img_format == 'JPEG':
+        save_params['progressive'] = True
+    if strip_metadata:
+        save_params['exif'] = b''
+        save_params['icc_profile'] = None
+    else:
+        for key in ['exif', 'icc_profile']:
+            if key in img.info:
+                save_params[key] = img.info[key]
+
+    buffer = io.BytesIO()
+    img.save(buffer, **save_params)
+    content = buffer.getvalue()
+
+    # Keeping the source content if processing didn't reduce it (only when metadata may be kept)
+    if not strip_metadata and not resized and len(content) >= len(source):
+        content = source
+
+    write_cache(cache_path, content)
+
+    return content
@@ -35,10 +35,17 @@ from exchangelib import Credentials, Account, Configuration, Message, DELEGATE,
 import os
 import ntpath
 from dotenv import load_dotenv
-import pandas as pd
 import io
 from pretty_html_table import build_table
 
+# xchange_mail functions
+from xchange_mail.recipients import resolve_recipients
+from xchange_mail.images import optimize_image
+from xchange_mail.spec import MailSpec
+from xchange_mail.budget import reserve_payload
+from xchange_mail.arrow import is_arrow_table, buffer_arrow_table, to_pandas_frame
+from xchange_mail.profiling import profiled, mark_phase
+
 
 """
 ---------------------------------------------------
@@ -74,6 +81,29 @@ def connect_exchange(username, password, server, mail_box, auto_discover=False,
     
     return account
 
+# Validating recipients before building a mail
+def check_recipients(account, mail_to):
+    """
+    Resolves recipients using the shared recipients cache and warns about the invalid ones
+    
+    Parameters
+    ----------
+    :param account: exchange object with user account information [type: Account]
+    :param mail_to: recipients as a string separated by ";" or as a list [type: string or list]
+    
+    Return
+    ------
+    :return recipients: list of valid addresses with distribution lists expanded [type: list]
+    """
+    
+    recipients, invalid = resolve_recipients(account, mail_to)
+    if len(invalid) > 0:
+        print(f'Invalid recipients removed: {invalid}')
+    if len(recipients) == 0:
+        print('There are no valid recipients. The mail will not be sent')
+    
+    return recipients
+
 # Function for streaming DataFrame objects and attaching it to the mail
 def buffer_dataframe(name, df):
     """
@@ -81,14 +111,18 @@ def buffer_dataframe(name, df):
     
     Parameters
     ----------
-    :param name: filename with extension (csv or xlsx) [type: string]
-    :param df: DataFrame object to be attached [type: pd.DataFrame]
+    :param name: filename with extension (csv, txt, parquet or xlsx) [type: string]
+    :param df: DataFrame object (or Arrow compatible table) to be attached [type: pd.DataFrame]
     
     Return
     ------
     :return attachment_list: list with name [0] and DataFrame content on bytes [1] of the DataFrame provided [type: list]
     """
     
+    # Arrow tables and Polars frames are written straight from Arrow buffers
+    if is_arrow_table(df):
+        return buffer_arrow_table(name, df)
+    
     # Creating a buffer for storing bytes
     buffer = io.BytesIO()
     
@@ -101,8 +135,10 @@ def buffer_dataframe(name, df):
             df.to_csv(buffer)
         elif file_ext == '.xlsx':
             df.to_excel(buffer)
+        elif file_ext == '.parquet':
+            df.to_parquet(buffer)
         else:
-            print('Invalid extension. Options: "csv", "txt" e "xlsx"')
+            print('Invalid extension. Options: "csv", "txt", "parquet" e "xlsx"')
 
         # Reading buffer content
         buffer_content = buffer.getvalue()
@@ -115,11 +151,17 @@ def buffer_dataframe(name, df):
             df.to_csv(buffer)
         elif file_ext == '.xlsx':
             df.to_excel(buffer)
+        elif file_ext == '.parquet':
+            # Parquet is a binary format, so it is written on a new bytes buffer
+            buffer = io.BytesIO()
+            df.to_parquet(buffer)
         else:
-            print('Invalid extension. Options: "csv", "txt" e "xlsx"')
+            print('Invalid extension. Options: "csv", "txt", "parquet" e "xlsx"')
         
         #  Reading buffer content
-        buffer_content = buffer.getvalue().encode()
+        buffer_content = buffer.getvalue()
+        if isinstance(buffer_content, str):
+            buffer_content = buffer_content.encode()
     
     return [name, buffer_content]
 
@@ -135,7 +177,7 @@ def format_html_body(string_mail_body, mail_signature='', **kwargs):
     :param string_mail_body: raw string mail body [type: string]
         *can have html code for be transformed on HTMLBody class
     :param **kwargs: additional parameters
-        :arg df: DataFrame object to be sent on mail body as a custom table [type: pd.DataFrame]
+        :arg df: DataFrame object or Arrow compatible table (or list of them) to be sent on mail body [type: pd.DataFrame or list]
         :arg color: color configuration from pretty_html_table [type: string, default='blue_light']
         :arg font_size: font size for html table built from DataFrame [type: string, default='medium']
         :arg font_family: font family for html table built from DataFrame [type: string, default='Century Gothic']
@@ -153,13 +195,14 @@ def format_html_body(string_mail_body, mail_signature='', **kwargs):
     font_family = kwargs['font_family'] if 'font_family' in kwargs else 'Century Gothic'
     text_align = kwargs['text_align'] if 'text_align' in kwargs else 'left'
     
-    # Building a html table from DataFrame if applicable
+    # Building a html table from each DataFrame if applicable
     if df is not None:
-        html_df = build_table(df, 
-                              color=color, 
-                              font_size=font_size, 
-                              font_family=font_family, 
-                              text_align=text_align)
+        dfs = df if isinstance(df, list) else [df]
+        html_df = ''.join(build_table(to_pandas_frame(table), 
+                                      color=color, 
+                                      font_size=font_size, 
+                                      font_family=font_family, 
+                                      text_align=text_align) for table in dfs)
         
         return HTMLBody(string_mail_body + html_df + mail_signature)
     else:
@@ -167,11 +210,12 @@ def format_html_body(string_mail_body, mail_signature='', **kwargs):
         return HTMLBody(string_mail_body + mail_signature)
 
 # Sending a simple mail with useful customization
+@profiled('send_simple_mail')
 def send_simple_mail(username, password, server, mail_box, subject, mail_to, mail_body='', mail_signature='',
                      auto_discover=False, access_type=DELEGATE, df=None, df_on_body=False, 
                      df_on_attachment=False, attachment_filename='file.csv', image_on_body=False, 
                      image_location=None, image_filename='image.png', image_hyperlink=None, 
-                     local_attachment_path=None, **kwargs):
+                     image_optimize=False, local_attachment_path=None, account=None, resolve_mail_to=False, **kwargs):
     """
     Handles the mail sending of a simple mail. Things that this function can do:
         * Send a mail with simple mail subject, body and signature for one or more recipients
@@ -199,22 +243,37 @@ def send_simple_mail(username, password, server, mail_box, subject, mail_to, mai
     :param image_location: location of image stored on disk [type: string, default=None]
     :param image_filename: filename for attached image [type: string, default='image.png']
     :param image_hyperlink: hyperlink to be put on image body [type: string, default=None]
+    :param image_optimize: flag for downscaling and compressing the image before embedding it [type: bool, default=False]
     :param local_attachment_path: path to file to be attached [type: string, default=None]
+    :param account: already connected account to be reused instead of a new connection [type: Account, default=None]
+    :param resolve_mail_to: flag for validating and expanding recipients before building the mail [type: bool, default=False]
     :param **kwargs: additional parameters
         :arg df: DataFrame object to be sent on mail body as a custom table [type: pd.DataFrame]
         :arg color: color configuration from pretty_html_table [type: string, default='blue_light']
         :arg font_size: font size for html table built from DataFrame [type: string, default='medium']
         :arg font_family: font family for html table built from DataFrame [type: string, default='Century Gothic']
         :arg text_align: text allign for html table built from DataFrame [type: string, default='left']
+        :arg image_max_width: max display width of optimized image in pixels [type: int, default=None]
+        :arg image_quality: JPEG quality of optimized image [type: int, default=85]
+        :arg image_cache_dir: cache directory for optimized images [type: string, default=None]
  
     Return
     ------
-    This function returns anything besides the mail sending
+    :return sent: flag indicating that the mail was sent (False if no valid recipients were left) [type: bool]
     """
     
-    # Creating and configuring account using function parameters
-    account = connect_exchange(username=username, password=password, server=server, mail_box=mail_box,
-                               auto_discover=auto_discover, access_type=access_type)
+    # Creating and configuring account using function parameters (if a connected one wasn't provided)
+    mark_phase('connect')
+    if account is None:
+        account = connect_exchange(username=username, password=password, server=server, mail_box=mail_box,
+                                   auto_discover=auto_discover, access_type=access_type)
+
+    # Validating and expanding recipients before the heavy mail building
+    if resolve_mail_to:
+        mark_phase('recipients')
+        mail_to = check_recipients(account, mail_to)
+        if len(mail_to) == 0:
+            return False
 
     # Extracting kwargs
     color = kwargs['color'] if 'color' in kwargs else 'blue_light'
@@ -222,71 +281,90 @@ def send_simple_mail(username, password, server, mail_box, subject, mail_to, mai
     font_family = kwargs['font_family'] if 'font_family' in kwargs else 'Century Gothic'
     text_align = kwargs['text_align'] if 'text_align' in kwargs else 'left'
 
-    # Formatting html to be sent on body. If df is passed, it builds a custom html table
-    if df_on_body and df is not None:
-        html_body = format_html_body(mail_body, df=df, mail_signature=mail_signature, color=color,
-                                     font_size=font_size, font_family=font_family, text_align=text_align)
-    else:
-        html_body = format_html_body(mail_body, mail_signature=mail_signature, color=color,
-                                     font_size=font_size, font_family=font_family, text_align=text_align)
-
-    # Creating a message object
-    m = Message(account=account,
-                subject=subject,
-                body=html_body,
-                to_recipients=mail_to)
+    # Reserving the message payload from the memory budget until the message is sent
+    payload = [df if df_on_body or df_on_attachment else None,
+               image_location if image_on_body else None,
+               local_attachment_path]
+    mark_phase('budget')
+    with reserve_payload(*payload):
+        # Formatting html to be sent on body. If df is passed, it builds a custom html table
+        mark_phase('body')
+        if df_on_body and df is not None:
+            html_body = format_html_body(mail_body, df=df, mail_signature=mail_signature, color=color,
+                                         font_size=font_size, font_family=font_family, text_align=text_align)
+        else:
+            html_body = format_html_body(mail_body, mail_signature=mail_signature, color=color,
+                                         font_size=font_size, font_family=font_family, text_align=text_align)
+
+        # Creating a message object
+        m = Message(account=account,
+                    subject=subject,
+                    body=html_body,
+                    to_recipients=mail_to)
     
-    # Validating attachments
-    if df_on_attachment and df is not None:
-        attachments = [buffer_dataframe(name=attachment_filename, df=df)]
+        # Validating attachments
+        mark_phase('attachments')
+        if df_on_attachment and df is not None:
+            attachments = [buffer_dataframe(name=attachment_filename, df=df)]
 
-        # Attaching a DataFrame
-        for name, content in attachments or []:
-            file = FileAttachment(name=name, content=content)
-            m.attach(file)
+            # Attaching a DataFrame
+            for name, content in attachments or []:
+                file = FileAttachment(name=name, content=content)
+                m.attach(file)
 
-    # Putting image on body if applicable
-    if image_on_body and image_location is not None:
+        # Putting image on body if applicable
+        if image_on_body and image_location is not None:
         
-        # Opening local image and creating the attachment content
-        with open(image_location, 'rb') as f:
+            # Opening local image (optimized if applicable) and creating the attachment content
+            if image_optimize:
+                image_content = optimize_image(image_location,
+                                               max_width=kwargs['image_max_width'] if 'image_max_width' in kwargs else None,
+                                               quality=kwargs['image_quality'] if 'image_quality' in kwargs else 85,
+                                               cache_dir=kwargs['image_cache_dir'] if 'image_cache_dir' in kwargs else None)
+            else:
+                with open(image_location, 'rb') as f:
+                    image_content = f.read()
             img = FileAttachment(
-                name=image_filename, content=f.read(),
+                name=image_filename, content=image_content,
                 is_inline=True, content_id=image_location
             )
 
-        # Attaching content and building a new HTMLBody with image
-        m.attach(img)
-        html_image_body = f'<img src="cid:{image_location}">'
-        if image_hyperlink is not None:
-            html_image_body = f'<a href={image_hyperlink}>' + html_image_body + '</a>'
+            # Attaching content and building a new HTMLBody with image
+            m.attach(img)
+            html_image_body = f'<img src="cid:{image_location}">'
+            if image_hyperlink is not None:
+                html_image_body = f'<a href={image_hyperlink}>' + html_image_body + '</a>'
         
-        # Adding initial body and signature
-        html_image_body = mail_body + html_image_body + mail_signature
+            # Adding initial body and signature
+            html_image_body = mail_body + html_image_body + mail_signature
 
-        m.body = HTMLBody(html_image_body)
+            m.body = HTMLBody(html_image_body)
 
-    # Verifying the need to attach a local file
-    local_attachments = []
-    if local_attachment_path is not None:
-        try:
-            with open(local_attachment_path, 'rb') as f:
-                content = f.read()
-            local_attachments.append((ntpath.basename(local_attachment_path), content))
+        # Verifying the need to attach a local file
+        local_attachments = []
+        if local_attachment_path is not None:
+            try:
+                with open(local_attachment_path, 'rb') as f:
+                    content = f.read()
+                local_attachments.append((ntpath.basename(local_attachment_path), content))
 
-            # Attaching to email
-            for name, content in local_attachments or []:
-                file = FileAttachment(name=name, content=content)
-                m.attach(file)
-        except Exception as e:
-            print(f'Error on reading file {local_attachment_path}. Exception: {e}')
+                # Attaching to email
+                for name, content in local_attachments or []:
+                    file = FileAttachment(name=name, content=content)
+                    m.attach(file)
+            except Exception as e:
+                print(f'Error on reading file {local_attachment_path}. Exception: {e}')
 
-    # Sending message
-    m.send_and_save()
+        # Sending message
+        mark_phase('send')
+        m.send_and_save()
+
+    return True
 
 # Sending a mail using a meta_df data for handling multiple DataFrames and actions
 def send_mail_mult_files(meta_df, username, password, server, mail_box, subject, mail_body, 
-                         mail_to, mail_signature='', auto_discover=False, access_type=DELEGATE):
+                         mail_to, mail_signature='', auto_discover=False, access_type=DELEGATE, account=None,
+                         resolve_mail_to=False):
     """
     Handles multiple DataFrames object using a meta_df DataFrame that guides actions for each object.
     The mailing proccess uses this meta_df for attaching, sending DataFrames on body and more.
@@ -310,43 +388,128 @@ def send_mail_mult_files(meta_df, username, password, server, mail_box, subject,
     :param mail_signature: raw string or html code to be put at the end of body [type: string, default='']
     :param auto_discover: flag for pointing to EWS using a specific protocol [type: bool, default=False]
     :param access_type: access type associated to the credentials provided [type: obj, default=DELEGATE]
+    :param account: already connected account to be reused instead of a new connection [type: Account, default=None]
+    :param resolve_mail_to: flag for validating and expanding recipients before building the mail [type: bool, default=False]
  
     Return
     ------
-    This function returns anything besides sending the configured mail
+    :return sent: flag indicating that the mail was sent (False if no valid recipients were left) [type: bool]
     """
     
-    # Setting up account
-    account = connect_exchange(username=username, password=password, server=server, mail_box=mail_box,
-                               auto_discover=auto_discover, access_type=access_type)
-
-    # Filtering and formating DataFrames to be sent on body
-    meta_df_body = meta_df.query('flag_body == 1')
-    if len(meta_df_body) > 0:
-        html_df = pd.DataFrame(meta_df_body['df']).iloc[0, :]['df']
-        html_body = format_html_body(mail_body, df=html_df, mail_signature=mail_signature)
-    else:
-        html_body = format_html_body(mail_body, mail_signature=mail_signature)
+    # Adapting meta_df on a mail spec and sending it
+    spec = MailSpec.from_meta_df(meta_df, subject=subject, mail_to=mail_to, mail_body=mail_body,
+                                 mail_signature=mail_signature)
+    return send_mail_spec(spec, username=username, password=password, server=server, mail_box=mail_box,
+                          auto_discover=auto_discover, access_type=access_type, account=account,
+                          resolve_mail_to=resolve_mail_to)
+
+# Sending a mail described by a MailSpec object
+@profiled('send_mail_spec')
+def send_mail_spec(spec, username=None, password=None, server=None, mail_box=None, auto_discover=False,
+                   access_type=DELEGATE, account=None, resolve_mail_to=False):
+    """
+    Sends a mail described by a MailSpec object. Each AttachmentSpec of the mail spec guides if its
+    DataFrame is sent on mail body as a custom table, attached or both
     
-    # Creating a message object
-    m = Message(account=account,
-                subject=subject,
-                body=html_body,
-                to_recipients=mail_to)
+    Parameters
+    ----------
+    :param spec: mail content and attachments [type: MailSpec]
+    :param username: user mail with rights for sending mails through the mail box provided [type: string, default=None]
+    :param password: user passwords smtp [type: string, default=None]
+    :param server: server for managing the mail sending [type: string, default=None]
+    :param mail_box: primary address associated to the user account [type: string, default=None]
+    :param auto_discover: flag for pointing to EWS using a specific protocol [type: bool, default=False]
+    :param access_type: access type associated to the credentials provided [type: obj, default=DELEGATE]
+    :param account: already connected account to be reused instead of a new connection [type: Account, default=None]
+    :param resolve_mail_to: flag for validating and expanding recipients before building the mail [type: bool, default=False]
+ 
+    Return
+    ------
+    :return sent: flag indicating that the mail was sent (False if no valid recipients were left) [type: bool]
+    """
     
-    # Filtering and preparing DataFrames to be sent attached
-    meta_df_attach = meta_df.query('flag_attach == 1')
-    file_names = list(meta_df_attach['name'])
-    file_dfs = list(meta_df_attach['df'])
+    # Setting up account (if a connected one wasn't provided)
+    mark_phase('connect')
+    if account is None:
+        account = connect_exchange(username=username, password=password, server=server, mail_box=mail_box,
+                                   auto_discover=auto_discover, access_type=access_type)
+
+    # Validating and expanding recipients before the heavy mail building
+    mail_to = spec.mail_to
+    if resolve_mail_to:
+        mark_phase('recipients')
+        mail_to = check_recipients(account, mail_to)
+        if len(mail_to) == 0:
+            return False
 
-    attach_dict = {file_names.index(name) + 1: {'name': name, 'df': df} for name, df in zip(file_names, file_dfs)}
-    attachments = [buffer_dataframe(inner_dict['name'], inner_dict['df']) for idx, inner_dict in attach_dict.items()]
+    # Reserving the message payload from the memory budget until the message is sent
+    payload = [a.df if a.df is not None else (a.content if a.content is not None else a.path)
+               for a in spec.attachments]
+    mark_phase('budget')
+    with reserve_payload(*payload):
+        # Formating DataFrames to be sent on body
+        mark_phase('body')
+        body_dfs = [a.df for a in spec.attachments if a.on_body and a.df is not None]
+        if len(body_dfs) > 0:
+            html_body = format_html_body(spec.mail_body, df=body_dfs, mail_signature=spec.mail_signature,
+                                         **spec.table_options)
+        else:
+            html_body = format_html_body(spec.mail_body, mail_signature=spec.mail_signature)
+    
+        # Creating a message object
+        m = Message(account=account,
+                    subject=spec.subject,
+                    body=html_body,
+                    to_recipients=mail_to)
+    
+        # Preparing and attaching DataFrames and files
+        mark_phase('attachments')
+        for attachment in spec.attachments:
+            if not attachment.on_attachment:
+                continue
+            if attachment.df is not None:
+                name, content = buffer_dataframe(attachment.name, attachment.df)
+            elif attachment.content is not None:
+                name, content = attachment.name, attachment.content
+            elif attachment.path is not None:
+                with open(attachment.path, 'rb') as f:
+                    name, content = attachment.name, f.read()
+            else:
+                continue
+            m.attach(FileAttachment(name=name, content=content))
 
-    # Attaching files
-    for name, content in attachments or []:
-        file = FileAttachment(name=name, content=content)
-        m.attach(file)
+        # Sending message
+        mark_phase('send')
+        m.send_and_save()
 
-    # Sending message
-    m.send_and_save()
+    return True
 
+# Sending many mails described by MailSpec objects
+def send_mail_specs(specs, username=None, password=None, server=None, mail_box=None, auto_discover=False,
+                    access_type=DELEGATE, account=None, resolve_mail_to=False):
+    """
+    Sends many mails described by MailSpec objects through a single account connection
+    
+    Parameters
+    ----------
+    :param specs: mail specs to be sent [type: list]
+    :param username: user mail with rights for sending mails through the mail box provided [type: string, default=None]
+    :param password: user passwords smtp [type: string, default=None]
+    :param server: server for managing the mail sending [type: string, default=None]
+    :param mail_box: primary address associated to the user account [type: string, default=None]
+    :param auto_discover: flag for pointing to EWS using a specific protocol [type: bool, default=False]
+    :param access_type: access type associated to the credentials provided [type: obj, default=DELEGATE]
+    :param account: already connected account to be reused instead of a new connection [type: Account, default=None]
+    :param resolve_mail_to: flag for validating and expanding recipients before building each mail [type: bool, default=False]
+ 
+    Return
+    ------
+    This function returns anything besides sending the configured mails
+    """
+    
+    if account is None:
+        account = connect_exchange(username=username, password=password, server=server, mail_box=mail_box,
+                                   auto_discover=auto_discover, access_type=access_type)
+    
+    for spec in specs:
+        send_mail_spec(spec, account=account, resolve_mail_to=resolve_mail_to)
@@ -0,0 +1,312 @@
+"""
+---------------------------------------------------
+---------------- MODULE: Profiling ----------------
+---------------------------------------------------
+This module allocates an opt-in profiling mode for
+mail sends. When enabled, each send (or a sample of
+them) gets a CPU profile and the top allocation
+sites of each phase (connect, recipients, budget,
+body, attachments and send) written to a local directory,
+plus a summary line per send
+
+How to enable
+---------------------------------------------------
+* Environment variables:
+    XCHANGE_MAIL_PROFILE=<output_dir>
+    XCHANGE_MAIL_PROFILE_SAMPLE=<rate from 0 to 1>
+* Context manager:
+    with profile_sends('profiles', sample_rate=0.1):
+        send_simple_mail(...)
+
+Output files
+---------------------------------------------------
+* <send_id>.<phase>.prof: cProfile stats (pstats format)
+* <send_id>.alloc.txt: top allocation sites per phase
+* summary.log: one line per profiled send
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Send profiling
+    2.1 Profiling settings
+    2.2 Send profile
+    2.3 Instrumenting sends
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# Standard python libraries
+import os
+import time
+import uuid
+import random
+import cProfile
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+
+"""
+---------------------------------------------------
+---------------- 2. SEND PROFILING ----------------
+             2.1 Profiling settings
+---------------------------------------------------
+"""
+
+# Settings set by profile_sends() (they have priority over environment variables)
+_OVERRIDE = None
+
+# Profile of the send running on each thread
+_local = threading.local()
+
+# Lock for shared files and tracemalloc state
+_lock = threading.Lock()
+_tracing_sends = 0
+_started_tracing = False
+
+# Returning active profiling settings
+def profiling_settings():
+    """
+    Returns the active profiling settings from profile_sends() or from environment variables
+
+    Return
+    ------
+    :return settings: dictionary with output_dir, sample_rate and top keys or None if disabled [type: dict]
+    """
+
+    if _OVERRIDE is not None:
+        return _OVERRIDE
+
+    output_dir = os.getenv('XCHANGE_MAIL_PROFILE')
+    if not output_dir:
+        return None
+
+    return {'output_dir': output_dir,
+            'sample_rate': _env_number('XCHANGE_MAIL_PROFILE_SAMPLE', float, 1.0),
+            'top': _env_number('XCHANGE_MAIL_PROFILE_TOP', int, 10)}
+
+# Reading a number from an environment variable, using the default value if it is malformed
+def _env_number(name, cast, default):
+    value = os.getenv(name, '').strip()
+    if value == '':
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        print(f'Invalid {name}="{value}". Using {default}')
+        return default
+
+# Enabling profiling on a block of code
+@contextmanager
+def profile_sends(output_dir='xchange_mail_profiles', sample_rate=1.0, top=10):
+    """
+    Context manager that profiles sends made inside it
+
+    Parameters
+    ----------
+    :param output_dir: directory for profile files [type: string, default='xchange_mail_profiles']
+    :param sample_rate: fraction of sends to be profiled [type: float, default=1.0]
+    :param top: number of allocation sites written per phase [type: int, default=10]
+    """
+
+    global _OVERRIDE
+    previous = _OVERRIDE
+    _OVERRIDE = {'output_dir': output_dir, 'sample_rate': sample_rate, 'top': top}
+    try:
+        yield
+    finally:
+        _OVERRIDE = previous
+
+
+"""
+---------------------------------------------------
+---------------- 2. SEND PROFILING ----------------
+                2.2 Send profile
+---------------------------------------------------
+"""
+
+# Profile of a single send
+class SendProfile:
+    """
+    Collects CPU profile, elapsed time and allocations of each phase of a send
+
+    Parameters
+    ----------
+    :param send_name: name of the sending function [type: string]
+    :param output_dir: directory for profile files [type: string]
+    :param top: number of allocation sites written per phase [type: int, default=10]
+    """
+
+    def __init__(self, send_name, output_dir, top=10):
+        self.send_name = send_name
+        self.output_dir = output_dir
+        self.top = top
+        self.send_id = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.phases = []
+        self._phase = None
+        self._start = time.perf_counter()
+        os.makedirs(output_dir, exist_ok=True)
+        _start_tracing()
+
+    def mark(self, phase):
+        """
+        Finishes the current phase (if any) and starts a new one
+        """
+
+        self._stop_phase()
+
+        # cProfile allows a single active profiler on some python versions. CPU profile is skipped if busy
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None
+
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self._phase = {'name': phase, 'profiler': profiler, 'snapshot': _take_snapshot(),
+                       'start': time.perf_counter()}
+
+    def _stop_phase(self):
+        if self._phase is None:
+            return
+
+        phase, self._phase = self._phase, None
+        elapsed = time.perf_counter() - phase['start']
+        if phase['profiler'] is not None:
+            phase['profiler'].disable()
+            phase['profiler'].dump_stats(os.path.join(self.output_dir, f'{self.send_id}.{phase["name"]}.prof'))
+
+        # Comparing allocations with the beginning of the phase
+        stats = _take_snapshot().compare_to(phase['snapshot'], 'lineno')
+        allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+        peak = tracemalloc.get_traced_memory()[1]
+        with open(os.path.join(self.output_dir, f'{self.send_id}.alloc.txt'), 'a', encoding='utf-8') as f:
+            f.write(f'--- {phase["name"]}: {elapsed:.3f}s, {allocated / 1024 ** 2:.2f} MB allocated\n')
+            for stat in stats[:self.top]:
+                f.write(f'{stat}\n')
+
+        self.phases.append({'name': phase['name'], 'elapsed': elapsed, 'allocated': allocated, 'peak': peak})
+
+    def finish(self, error=None):
+        """
+        Finishes the last phase and writes the summary line of the send
+        """
+
+        try:
+            self._stop_phase()
+        finally:
+            _stop_tracing()
+
+        total = time.perf_counter() - self._start
+        peak = max([p['peak'] for p in self.phases] or [0])
+        status = 'ok' if error is None else f'error={type(error).__name__}'
+        phases = ' '.join(f'{p["name"]}={p["elapsed"]:.3f}s/{p["allocated"] / 1024 ** 2:.2f}MB' for p in self.phases)
+        line = f'{self.send_id} {self.send_name} {status} total={total:.3f}s {phases} peak={peak / 1024 ** 2:.2f}MB\n'
+        with _lock:
+            with open(os.path.join(self.output_dir, 'summary.log'), 'a', encoding='utf-8') as f:
+                f.write(line)
+
+        return line
+
+# Taking a tracemalloc snapshot without tracemalloc own allocations
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+# Starting tracemalloc if it is not running yet
+def _start_tracing():
+    global _tracing_sends, _started_tracing
+    with _lock:
+        if _tracing_sends == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_sends += 1
+
+# Stopping tracemalloc if it was started here and there are no other sends being profiled
+def _stop_tracing():
+    global _tracing_sends, _started_tracing
+    with _lock:
+        _tracing_sends -= 1
+        if _tracing_sends == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+"""
+---------------------------------------------------
+---------------- 2. SEND PROFILING ----------------
+             2.3 Instrumenting sends
+---------------------------------------------------
+"""
+
+# Decorating a sending function
+def profiled(send_name):
+    """
+    Decorator that profiles a sending function when profiling is enabled. Sends made inside another
+    profiled send are part of the outer profile
+
+    Parameters
+    ----------
+    :param send_name: name written on summary line [type: string]
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            settings = profiling_settings()
+            if settings is None or getattr(_local, 'profile', None) is not None \
+                    or random.random() >= settings['sample_rate']:
+                return func(*args, **kwargs)
+
+            # Profiling errors never break a send. They are logged and the send runs without profile
+            try:
+                profile = SendProfile(send_name, output_dir=settings['output_dir'], top=settings['top'])
+            except Exception as e:
+                print(f'Error on starting send profile. Exception: {e}')
+                return func(*args, **kwargs)
+
+            _local.profile = profile
+            error = None
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                _local.profile = None
+                try:
+                    profile.finish(error=error)
+                except Exception as e:
+                    print(f'Error on writing send profile. Exception: {e}')
+
+        return wrapper
+
+    return decorator
+
+# Marking the beginning of a phase
+def mark_phase(phase):
+    """
+    Starts a new phase on the profile of the current send. Does nothing if the send isn't profiled
+
+    Parameters
+    ----------
+    :param phase: phase name (connect, recipients, budget, body, attachments or send) [type: string]
+    """
+
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        try:
+            profile.mark(phase)
+        except Exception as e:
+            print(f'Error on marking profile phase {phase}. Exception: {e}')
@@ -0,0 +1,312 @@
+"""
+---------------------------------------------------
+--------------- MODULE: Recipients ----------------
+---------------------------------------------------
+This module allocates useful functions for parsing,
+validating and expanding recipients before a mail
+is built. Addresses are resolved using concurrent
+ResolveNames calls and distribution lists are
+expanded using ExpandDL, with results kept on a TTL
+cache shared across sends
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Recipients resolution
+    2.1 TTL cache
+    2.2 Parsing and resolving recipients
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# Exchangelib classes
+from exchangelib.errors import ResponseMessageError, ErrorNameResolutionNoResults, ErrorServerBusy, \
+                               ErrorTooManyObjectsOpened, ErrorInternalServerTransientError, ErrorTimeoutExpired
+
+# Standard python libraries
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+"""
+---------------------------------------------------
+------------- 2. RECIPIENTS RESOLUTION ------------
+                  2.1 TTL cache
+---------------------------------------------------
+"""
+
+# Thread safe cache with expiration time
+class TTLCache:
+    """
+    Stores values for a limited time. Used for sharing resolved recipients across sends
+
+    Parameters
+    ----------
+    :param ttl: seconds each entry is kept on cache [type: int, default=3600]
+    :param maxsize: max number of entries (the oldest ones are dropped first) [type: int, default=100000]
+    """
+
+    def __init__(self, ttl=3600, maxsize=100000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value of a key or the default value if it is missing or expired
+        """
+
+        with self._lock:
+            entry = self._data.get(key, None)
+            if entry is None:
+                return default
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return default
+
+            return entry[1]
+
+    def set(self, key, value):
+        """
+        Stores a value on cache
+        """
+
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.maxsize:
+                # Dicts keep insertion order, so the first key is the oldest one
+                del self._data[next(iter(self._data))]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        """
+        Removes all entries from cache
+        """
+
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Cache shared by all sends of the current process
+RECIPIENT_CACHE = TTLCache(ttl=3600)
+
+# Marker for a missing cache entry (None means an invalid address)
+_MISSING = object()
+
+# Mailbox types returned by Exchange for distribution lists
+DL_MAILBOX_TYPES = ['PublicDL', 'PrivateDL']
+
+# Exchange errors that don't tell anything about the entry, so the call is retried
+RETRYABLE_ERRORS = (ErrorServerBusy, ErrorTooManyObjectsOpened, ErrorInternalServerTransientError, ErrorTimeoutExpired)
+
+# Well-formed address (checked before calling Exchange)
+MAIL_PATTERN = re.compile(r'^[^@\s<>;,]+@[^@\s<>;,]+\.[^@\s<>;,]+$')
+
+
+"""
+---------------------------------------------------
+------------- 2. RECIPIENTS RESOLUTION ------------
+       2.2 Parsing and resolving recipients
+---------------------------------------------------
+"""
+
+# Parsing recipients
+def parse_recipients(mail_to):
+    """
+    Transforms a string with addresses separated by semicolon (or a list of them) on a list of unique addresses
+
+    Parameters
+    ----------
+    :param mail_to: recipients as a string separated by ";" or as a list [type: string or list]
+
+    Return
+    ------
+    :return recipients: list of unique addresses keeping the original order [type: list]
+    """
+
+    if mail_to is None:
+        return []
+    if isinstance(mail_to, str):
+        mail_to = [mail_to]
+
+    recipients = []
+    seen = set()
+    for entry in mail_to:
+        for mail in str(entry).replace(',', ';').split(';'):
+            mail = mail.strip()
+            if mail and mail.lower() not in seen:
+                seen.add(mail.lower())
+                recipients.append(mail)
+
+    return recipients
+
+# Expanding a distribution list
+def expand_distribution_list(account, mail, visited=None):
+    """
+    Expands a distribution list into its members addresses, including nested distribution lists
+
+    Parameters
+    ----------
+    :param account: exchange object with user account information [type: Account]
+    :param mail: distribution list address [type: string]
+    :param visited: distribution lists already expanded, for avoiding cycles [type: set, default=None]
+
+    Return
+    ------
+    :return members: list of members addresses [type: list]
+    """
+
+    visited = set() if visited is None else visited
+    visited.add(mail.lower())
+
+    members = []
+    for member in account.protocol.expand_dl(mail):
+        if member.email_address is None:
+            continue
+        if member.mailbox_type in DL_MAILBOX_TYPES:
+            if member.email_address.lower() not in visited:
+                members += expand_distribution_list(account, member.email_address, visited=visited)
+        else:
+            members.append(member.email_address)
+
+    return members
+
+# Resolving a single recipient
+def resolve_entry(account, mail, expand_dl=True, max_attempts=3):
+    """
+    Resolves a single recipient with ResolveNames, so each result is matched to its own entry.
+    Well-formed addresses with no result (external SMTP addresses) are kept as they are. Throttling
+    and transient errors are retried and raised if they persist, as they don't make the entry invalid
+
+    Parameters
+    ----------
+    :param account: exchange object with user account information [type: Account]
+    :param mail: recipient address [type: string]
+    :param expand_dl: flag for expanding distribution lists into its members [type: bool, default=True]
+    :param max_attempts: attempts on throttling or transient errors [type: int, default=3]
+
+    Return
+    ------
+    :return addresses: list of addresses for the entry or None if it is invalid [type: list]
+    """
+
+    if not MAIL_PATTERN.match(mail):
+        return None
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return _resolve_entry(account, mail, expand_dl=expand_dl)
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_attempts:
+                raise
+            time.sleep(min(getattr(e, 'back_off', None) or attempt, 30))
+        except ResponseMessageError:
+            # Any other error on the response means Exchange rejected the entry
+            return None
+
+def _resolve_entry(account, mail, expand_dl=True):
+    mailboxes = []
+    for result in account.protocol.resolve_names([mail]):
+        if isinstance(result, ErrorNameResolutionNoResults):
+            continue
+        if isinstance(result, Exception):
+            raise result
+        mailbox = result[0] if isinstance(result, tuple) else result
+        if mailbox.email_address is not None:
+            mailboxes.append(mailbox)
+
+    # Choosing the mailbox of the entry: exact address first, then a single result (alias or proxy address)
+    exact = [m for m in mailboxes if m.email_address.lower() == mail.lower()]
+    if len(exact) > 0:
+        mailbox = exact[0]
+    elif len(mailboxes) == 1:
+        mailbox = mailboxes[0]
+    else:
+        # No result (external address) or ambiguous results: Exchange routes the address itself
+        return [mail]
+
+    if expand_dl and mailbox.mailbox_type in DL_MAILBOX_TYPES:
+        return expand_distribution_list(account, mailbox.email_address)
+
+    return [mailbox.email_address]
+
+# Resolving a recipient without failing the whole send
+def _resolve_or_keep(account, mail, expand_dl=True):
+    try:
+        return resolve_entry(account, mail, expand_dl=expand_dl), True
+    except Exception as e:
+        # Exchange couldn't answer (throttling, network). The entry is kept unresolved and not cached
+        print(f'Recipient {mail} could not be resolved and is kept as it is. Exception: {e!r}')
+        return [mail], False
+
+# Resolving recipients
+def resolve_recipients(account, mail_to, cache=RECIPIENT_CACHE, expand_dl=True, max_workers=8):
+    """
+    Validates and expands recipients using ResolveNames and ExpandDL calls before a mail is built. Each
+    entry is resolved on its own call (calls run concurrently) and addresses already resolved are taken
+    from cache, so recurrent distribution lists are resolved only once. Only entries that are not
+    well-formed addresses or that Exchange explicitly rejects are invalid. Entries that couldn't be
+    resolved (persistent throttling or network errors) are kept as they are and are not cached
+
+    Parameters
+    ----------
+    :param account: exchange object with user account information [type: Account]
+    :param mail_to: recipients as a string separated by ";" or as a list [type: string or list]
+    :param cache: cache for resolved addresses (None disables caching) [type: TTLCache, default=RECIPIENT_CACHE]
+    :param expand_dl: flag for expanding distribution lists into its members [type: bool, default=True]
+    :param max_workers: max number of concurrent ResolveNames calls [type: int, default=8]
+
+    Return
+    ------
+    :return recipients: list of valid and unique addresses [type: list]
+    :return invalid: list of addresses that are not well-formed or were rejected [type: list]
+    """
+
+    recipients = parse_recipients(mail_to)
+
+    # Looking for addresses on cache
+    resolved = {}
+    pending = []
+    for mail in recipients:
+        cached = cache.get((mail.lower(), expand_dl), _MISSING) if cache is not None else _MISSING
+        if cached is _MISSING:
+            pending.append(mail)
+        else:
+            resolved[mail.lower()] = cached
+
+    # Resolving missing addresses concurrently
+    if len(pending) > 0:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+            values = list(executor.map(lambda mail: _resolve_or_keep(account, mail, expand_dl=expand_dl), pending))
+        for mail, (value, cacheable) in zip(pending, values):
+            resolved[mail.lower()] = value
+            if cache is not None and cacheable:
+                cache.set((mail.lower(), expand_dl), value)
+
+    # Consolidating valid and invalid addresses
+    valid = []
+    invalid = []
+    for mail in recipients:
+        value = resolved[mail.lower()]
+        if value is None:
+            invalid.append(mail)
+        else:
+            valid += value
+
+    return parse_recipients(valid), invalid
@@ -0,0 +1,275 @@
+"""
+---------------------------------------------------
+---------------- MODULE: Sharding -----------------
+---------------------------------------------------
+This module allocates a pool of sender identities
+for routing messages across many mail boxes. As
+Exchange throttles per mail box and per user, the
+sending rate can only scale by spreading messages
+over more than one sender account
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Sender mail box pool
+    2.1 Routing and health tracking
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# xchange_mail functions
+from xchange_mail.mail import connect_exchange, send_simple_mail
+
+# Exchangelib classes
+from exchangelib import DELEGATE
+from exchangelib.errors import ErrorServerBusy, ErrorTooManyObjectsOpened, ErrorSubmissionQuotaExceeded
+
+# Standard python libraries
+import time
+import hashlib
+import threading
+
+
+"""
+---------------------------------------------------
+------------- 2. SENDER MAIL BOX POOL -------------
+          2.1 Routing and health tracking
+---------------------------------------------------
+"""
+
+# Exchange errors that indicate a throttled mail box
+THROTTLING_ERRORS = (ErrorServerBusy, ErrorTooManyObjectsOpened, ErrorSubmissionQuotaExceeded)
+
+# Routing policies available
+ROUTING_POLICIES = ['least_loaded', 'round_robin', 'consistent']
+
+# Creating load and health state shared by many processes
+def create_shared_state(manager):
+    """
+    Creates load and health state that many processes can share, so a mail box throttled on one
+    process is taken out of rotation on all of them and load counts every process in flight
+
+    Parameters
+    ----------
+    :param manager: started multiprocessing manager [type: multiprocessing.managers.SyncManager]
+
+    Return
+    ------
+    :return state: shared dictionary with the counters of each mail box [type: DictProxy]
+    :return lock: shared lock guarding the state [type: AcquirerProxy]
+    """
+
+    return manager.dict(), manager.Lock()
+
+# Pool of sender identities
+class MailboxPool:
+    """
+    Routes each message to one of many sender identities, taking throttled mail boxes out of rotation.
+    By default, load and health are tracked only on the current process. Pools on different processes
+    share them when they receive the same state and lock from create_shared_state()
+
+    Parameters
+    ----------
+    :param identities: sender identities as (username, password, mail_box) tuples [type: list]
+    :param server: server for managing the mail sending [type: string]
+    :param policy: routing policy. Options: "least_loaded", "round_robin", "consistent" [type: string, default='least_loaded']
+        *least_loaded: the healthy mail box with fewer messages in flight (and fewer sent on ties)
+        *round_robin: healthy mail boxes in turns
+        *consistent: the same recipients list is always routed to the same mail box while it is healthy
+    :param cooldown: seconds a throttled mail box stays out of rotation [type: int, default=60]
+    :param auto_discover: flag for pointing to EWS using a specific protocol [type: bool, default=False]
+    :param access_type: access type associated to the credentials provided [type: obj, default=DELEGATE]
+    :param shared_state: state shared by many processes [type: DictProxy, default=None]
+    :param shared_lock: lock guarding the shared state [type: AcquirerProxy, default=None]
+    """
+
+    def __init__(self, identities, server, policy='least_loaded', cooldown=60, auto_discover=False,
+                 access_type=DELEGATE, shared_state=None, shared_lock=None):
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f'Invalid routing policy "{policy}". Options: {ROUTING_POLICIES}')
+        if len(identities) == 0:
+            raise ValueError('At least one sender identity is required')
+        if (shared_state is None) != (shared_lock is None):
+            raise ValueError('shared_state and shared_lock must be provided together')
+
+        self.server = server
+        self.policy = policy
+        self.cooldown = cooldown
+        self.auto_discover = auto_discover
+        self.access_type = access_type
+
+        # Credentials and connected account of each mail box (never shared between processes)
+        self.mail_boxes = [{'username': username, 'password': password, 'mail_box': mail_box, 'account': None}
+                           for username, password, mail_box in identities]
+
+        # Load and health counters of each mail box, keyed by its address. Wall clock time is used
+        # for throttle deadlines as they may be compared by different processes
+        self._state = shared_state if shared_state is not None else {}
+        self._lock = shared_lock if shared_lock is not None else threading.Lock()
+        with self._lock:
+            for box in self.mail_boxes:
+                if box['mail_box'] not in self._state:
+                    self._state[box['mail_box']] = {'in_flight': 0, 'sent': 0, 'throttled_until': 0.0}
+            if '_next' not in self._state:
+                self._state['_next'] = 0
+
+    # Updating counters of a mail box (values are reassigned, so shared dictionaries see the change)
+    def _update(self, box, **changes):
+        counters = dict(self._state[box['mail_box']])
+        for key, value in changes.items():
+            counters[key] = value(counters[key]) if callable(value) else value
+        self._state[box['mail_box']] = counters
+
+    # Healthy mail boxes at the moment
+    def _healthy(self, now, counters):
+        return [box for box in self.mail_boxes if counters[box['mail_box']]['throttled_until'] <= now]
+
+    # Choosing a mail box according to the routing policy
+    def _route(self, healthy, counters, mail_to):
+        if self.policy == 'least_loaded':
+            return min(healthy, key=lambda box: (counters[box['mail_box']]['in_flight'],
+                                                 counters[box['mail_box']]['sent']))
+
+        if self.policy == 'round_robin':
+            next_idx = self._state['_next']
+            self._state['_next'] = next_idx + 1
+            return healthy[next_idx % len(healthy)]
+
+        # Consistent policy: hashing recipients and walking forward until a healthy mail box is found
+        recipients = ';'.join(sorted(str(mail).lower() for mail in (mail_to or [])))
+        idx = int(hashlib.md5(recipients.encode()).hexdigest(), 16) % len(self.mail_boxes)
+        for offset in range(len(self.mail_boxes)):
+            box = self.mail_boxes[(idx + offset) % len(self.mail_boxes)]
+            if box in healthy:
+                return box
+
+    def acquire(self, mail_to=None):
+        """
+        Reserves a healthy mail box for sending a message, waiting if all of them are throttled
+
+        Parameters
+        ----------
+        :param mail_to: recipients list used by the consistent policy [type: list, default=None]
+
+        Return
+        ------
+        :return box: mail box with "username", "password", "mail_box" and "account" keys [type: dict]
+        """
+
+        while True:
+            with self._lock:
+                now = time.time()
+                counters = {box['mail_box']: self._state[box['mail_box']] for box in self.mail_boxes}
+                healthy = self._healthy(now, counters)
+                if len(healthy) > 0:
+                    box = self._route(healthy, counters, mail_to)
+                    self._update(box, in_flight=lambda n: n + 1)
+                    break
+                wait = min(c['throttled_until'] for c in counters.values()) - now
+            time.sleep(max(wait, 0.1))
+
+        # Connecting the mail box only on its first use on this process
+        if box['account'] is None:
+            try:
+                box['account'] = connect_exchange(username=box['username'], password=box['password'],
+                                                  server=self.server, mail_box=box['mail_box'],
+                                                  auto_discover=self.auto_discover, access_type=self.access_type)
+            except Exception:
+                self.release(box, sent=False)
+                raise
+
+        return box
+
+    def release(self, box, sent=True):
+        """
+        Releases a mail box reserved by acquire()
+
+        Parameters
+        ----------
+        :param box: mail box returned by acquire() [type: dict]
+        :param sent: flag indicating that the message was sent [type: bool, default=True]
+        """
+
+        with self._lock:
+            self._update(box, in_flight=lambda n: n - 1, sent=lambda n: n + 1 if sent else n)
+
+    def mark_throttled(self, box, cooldown=None):
+        """
+        Takes a mail box out of rotation for a while (on every process sharing the state)
+
+        Parameters
+        ----------
+        :param box: mail box returned by acquire() [type: dict]
+        :param cooldown: seconds out of rotation (uses the pool cooldown if None) [type: int, default=None]
+        """
+
+        cooldown = self.cooldown if cooldown is None else cooldown
+        with self._lock:
+            self._update(box, throttled_until=lambda t: max(t, time.time() + cooldown))
+
+    def send(self, mail_to, send_func=send_simple_mail, max_attempts=None, **kwargs):
+        """
+        Sends a message through the routed mail box, retrying on another one if it gets throttled
+
+        Parameters
+        ----------
+        :param mail_to: recipients list [type: list]
+        :param send_func: xchange_mail sending function that accepts an account argument [type: function, default=send_simple_mail]
+        :param max_attempts: attempts before giving up (one per mail box if None) [type: int, default=None]
+        :param **kwargs: additional parameters passed to send_func (subject, mail_body, df and so on)
+
+        Return
+        ------
+        :return mail_box: primary address of the mail box that sent the message or None if send_func
+            returned False (no valid recipients left) [type: string]
+        """
+
+        max_attempts = max_attempts or len(self.mail_boxes)
+        for attempt in range(1, max_attempts + 1):
+            box = self.acquire(mail_to=mail_to)
+            try:
+                sent = send_func(username=box['username'], password=box['password'], server=self.server,
+                                 mail_box=box['mail_box'], mail_to=mail_to, account=box['account'], **kwargs)
+            except THROTTLING_ERRORS as e:
+                self.release(box, sent=False)
+                self.mark_throttled(box, cooldown=getattr(e, 'back_off', None))
+                if attempt == max_attempts:
+                    raise
+                continue
+            except Exception:
+                self.release(box, sent=False)
+                raise
+
+            # Sending functions return False when no valid recipients were left
+            if sent is False:
+                self.release(box, sent=False)
+                return None
+
+            self.release(box, sent=True)
+            return box['mail_box']
+
+    def stats(self):
+        """
+        Returns load and health information of each mail box
+
+        Return
+        ------
+        :return stats: list of dictionaries with mail box, messages in flight, sent and throttle state [type: list]
+        """
+
+        with self._lock:
+            now = time.time()
+            counters = {box['mail_box']: self._state[box['mail_box']] for box in self.mail_boxes}
+
+        return [{'mail_box': mail_box, 'in_flight': c['in_flight'], 'sent': c['sent'],
+                 'throttled': c['throttled_until'] > now} for mail_box, c in counters.items()]
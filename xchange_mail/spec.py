@@ -0,0 +1,125 @@
+"""
+---------------------------------------------------
+------------------ MODULE: Spec -------------------
+---------------------------------------------------
+This module allocates lightweight classes for
+describing mails to be sent. A MailSpec holds the
+mail content and a list of AttachmentSpec objects,
+each one telling if a DataFrame (or a file) goes on
+mail body, attached or both. These objects are
+consumed directly by send_mail_spec() on mail module
+
+Table of Contents
+---------------------------------------------------
+1. Mail specs
+    1.1 Attachment spec
+    1.2 Mail spec
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+----------------- 1. MAIL SPECS -------------------
+               1.1 Attachment spec
+---------------------------------------------------
+"""
+
+# Describing a DataFrame or file to be sent
+class AttachmentSpec:
+    """
+    Describes a DataFrame or a file to be sent on mail body and/or attached
+
+    Parameters
+    ----------
+    :param name: filename with extension (csv, txt or xlsx for DataFrames) [type: string]
+    :param df: DataFrame object [type: pd.DataFrame, default=None]
+    :param content: raw file content, used when df is None [type: bytes, default=None]
+    :param path: path to local file, used when df and content are None [type: string, default=None]
+    :param on_body: flag for sending the DataFrame on mail body as a custom table [type: bool, default=False]
+    :param on_attachment: flag for sending the DataFrame or file attached [type: bool, default=True]
+    """
+
+    __slots__ = ('name', 'df', 'content', 'path', 'on_body', 'on_attachment')
+
+    def __init__(self, name, df=None, content=None, path=None, on_body=False, on_attachment=True):
+        self.name = name
+        self.df = df
+        self.content = content
+        self.path = path
+        self.on_body = on_body
+        self.on_attachment = on_attachment
+
+    def __repr__(self):
+        return f'AttachmentSpec(name={self.name!r}, on_body={self.on_body}, on_attachment={self.on_attachment})'
+
+
+"""
+---------------------------------------------------
+----------------- 1. MAIL SPECS -------------------
+                 1.2 Mail spec
+---------------------------------------------------
+"""
+
+# Describing a mail to be sent
+class MailSpec:
+    """
+    Describes a mail with its content and attachments
+
+    Parameters
+    ----------
+    :param subject: mail subject [type: string]
+    :param mail_to: recipients list [type: list]
+    :param mail_body: body raw string or html code [type: string, default='']
+    :param mail_signature: raw string or html code to be put at the end of body [type: string, default='']
+    :param attachments: DataFrames and files to be sent on body and/or attached [type: list, default=None]
+    :param table_options: pretty_html_table options for tables on body [type: dict, default=None]
+        *keys: color, font_size, font_family and text_align
+    """
+
+    __slots__ = ('subject', 'mail_to', 'mail_body', 'mail_signature', 'attachments', 'table_options')
+
+    def __init__(self, subject, mail_to, mail_body='', mail_signature='', attachments=None, table_options=None):
+        self.subject = subject
+        self.mail_to = mail_to
+        self.mail_body = mail_body
+        self.mail_signature = mail_signature
+        self.attachments = list(attachments) if attachments is not None else []
+        self.table_options = dict(table_options) if table_options is not None else {}
+
+    def __repr__(self):
+        return f'MailSpec(subject={self.subject!r}, mail_to={self.mail_to!r}, attachments={self.attachments!r})'
+
+    @classmethod
+    def from_meta_df(cls, meta_df, subject, mail_to, mail_body='', mail_signature=''):
+        """
+        Builds a MailSpec from a meta_df DataFrame used by send_mail_mult_files(). Only the first DataFrame
+        flagged with flag_body is sent on body and attachments with the same name keep the last DataFrame
+
+        Parameters
+        ----------
+        :param meta_df: DataFrame object with "name", "df", "flag_body" and "flag_attach" columns [type: pd.DataFrame]
+        :param subject: mail subject [type: string]
+        :param mail_to: recipients list [type: list]
+        :param mail_body: body raw string or html code [type: string, default='']
+        :param mail_signature: raw string or html code to be put at the end of body [type: string, default='']
+
+        Return
+        ------
+        :return spec: mail spec with one AttachmentSpec per flagged line of meta_df [type: MailSpec]
+        """
+
+        body_spec = None
+        attachments = {}
+        for name, df, flag_body, flag_attach in zip(meta_df['name'], meta_df['df'],
+                                                    meta_df['flag_body'], meta_df['flag_attach']):
+            if flag_body == 1 and body_spec is None:
+                body_spec = AttachmentSpec(name, df=df, on_body=True, on_attachment=False)
+            if flag_attach == 1:
+                attachments[name] = AttachmentSpec(name, df=df)
+
+        specs = ([body_spec] if body_spec is not None else []) + list(attachments.values())
+
+        return cls(subject, mail_to, mail_body=mail_body, mail_signature=mail_signature, attachments=specs)
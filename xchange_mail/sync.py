@@ -0,0 +1,262 @@
+"""
+---------------------------------------------------
+------------------ MODULE: Sync -------------------
+---------------------------------------------------
+This module allocates useful functions for reading
+mails through exchange. Instead of scanning a whole
+folder, it uses EWS incremental sync (SyncFolderItems)
+with a sync state persisted on disk, so each poll
+returns only new or changed items
+
+Table of Contents
+---------------------------------------------------
+1. Initial setup
+    1.1 Importing libraries
+2. Incremental folder sync
+    2.1 Sync state persistence
+    2.2 Streaming changed items
+---------------------------------------------------
+"""
+
+# Date: 19/10/2026
+
+
+"""
+---------------------------------------------------
+---------------- 1. INITIAL SETUP -----------------
+             1.1 Importing libraries
+---------------------------------------------------
+"""
+
+# Exchangelib classes
+from exchangelib.errors import ErrorInvalidSyncStateData
+from exchangelib.fields import FieldPath
+from exchangelib.items import ID_ONLY
+from exchangelib.services import SyncFolderItems
+
+# Standard python libraries
+import os
+import json
+import time
+import tempfile
+
+
+"""
+---------------------------------------------------
+------------ 2. INCREMENTAL FOLDER SYNC -----------
+            2.1 Sync state persistence
+---------------------------------------------------
+"""
+
+# Fields fetched for each created or updated item
+DEFAULT_SYNC_FIELDS = ['subject', 'sender', 'datetime_received', 'item_class', 'in_reply_to', 'conversation_id']
+
+# Returning the key of a folder on the state file
+def folder_key(account, folder):
+    """
+    Returns the key used for storing the sync state of a folder
+
+    Parameters
+    ----------
+    :param account: exchange object with user account information [type: Account]
+    :param folder: exchangelib folder object [type: Folder]
+
+    Return
+    ------
+    :return key: mail box address and folder path [type: string]
+    """
+
+    return f'{account.primary_smtp_address}:{folder.absolute}'
+
+# Reading a sync state from disk
+def load_sync_state(state_path, key):
+    """
+    Reads the sync state of a folder from a json state file
+
+    Parameters
+    ----------
+    :param state_path: path to json state file [type: string]
+    :param key: folder key returned by folder_key() [type: string]
+
+    Return
+    ------
+    :return sync_state: last sync state or None if the folder was never synced [type: string]
+    """
+
+    if not os.path.exists(state_path):
+        return None
+
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get(key, None)
+
+# Writing a sync state on disk
+def save_sync_state(state_path, key, sync_state):
+    """
+    Writes the sync state of a folder on a json state file, keeping states of other folders
+
+    Parameters
+    ----------
+    :param state_path: path to json state file [type: string]
+    :param key: folder key returned by folder_key() [type: string]
+    :param sync_state: sync state returned by exchange [type: string]
+    """
+
+    states = {}
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            states = json.load(f)
+    states[key] = sync_state
+
+    # Writing on a temporary file first, so an interrupted write never loses the previous state
+    state_dir = os.path.dirname(os.path.abspath(state_path))
+    os.makedirs(state_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=state_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(states, f)
+        os.replace(tmp_path, state_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+"""
+---------------------------------------------------
+------------ 2. INCREMENTAL FOLDER SYNC -----------
+           2.2 Streaming changed items
+---------------------------------------------------
+"""
+
+# Initial sync modes
+INITIAL_SYNC_MODES = ['all', 'now']
+
+# Building the item fields requested on sync (same rules of exchangelib Folder.sync_items)
+def _sync_fields(account, folder, only_fields):
+    if only_fields is None:
+        return {FieldPath(field=f) for f in folder.allowed_item_fields(version=account.version)}
+
+    for field in only_fields:
+        folder.validate_item_field(field=field, version=account.version)
+
+    # ItemId and ChangeKey are always returned
+    return {f for f in folder.normalize_fields(fields=only_fields) if not f.field.is_attribute}
+
+# Streaming changes since the last sync
+def sync_folder_items(account, state_path, folder=None, only_fields=DEFAULT_SYNC_FIELDS, change_types=None,
+                      max_changes_per_request=100, initial_sync='all'):
+    """
+    Streams items created or changed on a folder since the last sync. Each SyncFolderItems page is
+    streamed as it arrives and the new sync state is persisted after the page is consumed, so an
+    interrupted poll only repeats its last page. An expired or invalid sync state is discarded and the
+    folder is synced again from the start
+
+    Parameters
+    ----------
+    :param account: exchange object with user account information [type: Account]
+    :param state_path: path to json state file [type: string]
+    :param folder: exchangelib folder object (uses account inbox if None) [type: Folder, default=None]
+    :param only_fields: item fields fetched for created or updated items [type: list, default=DEFAULT_SYNC_FIELDS]
+    :param change_types: change types to be returned (all of them if None) [type: list, default=None]
+        *options: "create", "update", "delete", "read_flag_change"
+    :param max_changes_per_request: max number of changes on each SyncFolderItems call [type: int, default=100]
+    :param initial_sync: behavior when the folder has no sync state [type: string, default='all']
+        *all: streams every item already on folder
+        *now: skips items already on folder and streams only the ones changed from now on
+
+    Return
+    ------
+    :return changes: generator of (change_type, item) tuples [type: generator]
+        *deleted items are returned as ItemId objects and read flag changes as (ItemId, is_read) tuples
+    """
+
+    if initial_sync not in INITIAL_SYNC_MODES:
+        raise ValueError(f'Invalid initial sync "{initial_sync}". Options: {INITIAL_SYNC_MODES}')
+
+    folder = account.inbox if folder is None else folder
+    key = folder_key(account, folder)
+    sync_state = load_sync_state(state_path, key)
+    skip_backlog = sync_state is None and initial_sync == 'now'
+    additional_fields = _sync_fields(account, folder, only_fields)
+
+    # Calling SyncFolderItems one page at a time (Folder.sync_items reads all pages before updating the state)
+    svc = SyncFolderItems(account=account)
+    while True:
+        try:
+            for change in svc.call(folder=folder, shape=ID_ONLY, additional_fields=additional_fields,
+                                   sync_state=sync_state, ignore=None, max_changes_returned=max_changes_per_request,
+                                   sync_scope=None):
+                if isinstance(change, ErrorInvalidSyncStateData):
+                    raise change
+                if isinstance(change, Exception):
+                    # Errors on single items are returned as exceptions by exchangelib
+                    print(f'Error on syncing an item of {key}. Exception: {change}')
+                    continue
+                if skip_backlog:
+                    continue
+
+                change_type, item = change
+                if change_types is None or change_type in change_types:
+                    yield change_type, item
+        except ErrorInvalidSyncStateData:
+            if sync_state is None:
+                raise
+            # The stored state expired or is invalid. Resetting it instead of failing on every poll
+            print(f'Invalid sync state for {key}. Syncing folder again from the start')
+            save_sync_state(state_path, key, None)
+            sync_state = None
+            skip_backlog = initial_sync == 'now'
+            continue
+
+        # The page was consumed. Persisting the new sync state
+        save_sync_state(state_path, key, svc.sync_state)
+
+        # Stopping on the last page (or when exchange returns the same state, as exchangelib does)
+        if svc.includes_last_item_in_range or svc.sync_state == sync_state:
+            break
+        sync_state = svc.sync_state
+
+# Polling a folder continuously
+def watch_folder_items(account, state_path, folder=None, interval=60, **kwargs):
+    """
+    Polls a folder forever, streaming only new or changed items on each poll
+
+    Parameters
+    ----------
+    :param account: exchange object with user account information [type: Account]
+    :param state_path: path to json state file [type: string]
+    :param folder: exchangelib folder object (uses account inbox if None) [type: Folder, default=None]
+    :param interval: seconds between polls [type: int, default=60]
+    :param **kwargs: additional parameters passed to sync_folder_items()
+
+    Return
+    ------
+    :return changes: generator of (change_type, item) tuples [type: generator]
+    """
+
+    while True:
+        yield from sync_folder_items(account, state_path, folder=folder, **kwargs)
+        time.sleep(interval)
+
+# Classifying items received as answers of sent reports
+def classify_item(item):
+    """
+    Classifies a synced item as a bounce (NDR), a receipt, a reply or other item
+
+    Parameters
+    ----------
+    :param item: item returned by sync_folder_items() with item_class field [type: Item]
+
+    Return
+    ------
+    :return category: "bounce", "receipt", "reply" or "other" [type: string]
+    """
+
+    item_class = (getattr(item, 'item_class', None) or '').upper()
+    if item_class.startswith('REPORT.') and item_class.endswith('.NDR'):
+        return 'bounce'
+    if item_class.startswith('REPORT.'):
+        return 'receipt'
+    if getattr(item, 'in_reply_to', None) is not None:
+        return 'reply'
+
+    return 'other'